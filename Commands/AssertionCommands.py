@@ -1,10 +1,12 @@
 import decorator
-import textwrap
-import time
 
 from selenium.common.exceptions import NoSuchElementException
 
+from SessionClasses.DomProbe import MISSING, probe_xpath, probe_xpaths
 from SessionClasses.Exceptions.PortalExceptions import *
+from SessionClasses.FrameTracker import switch_to_element_frame
+from SessionClasses.ElementCache import perform
+from SessionClasses.WaitCommands import find_element, poll_until
 
 from ControlObjects.ControlBase import ControlBase
 from ControlObjects.Button import Button
@@ -20,35 +22,20 @@ class AssertionCommands:
     """
     Assert-related functions to be called by users. Exceptions raised here are picked
     up by the session class, and reporting-decisions are made there.
+    Each assertion re-checks its condition with WaitCommands.poll_until until it
+    passes or default_int_seconds have passed.
     """
     function_args = {}
 
     @decorator.decorator  # Required to prevent "inspect" from recognizing this
     def __switch_frame(func, driver, page, *tokens):
         """
-        Searches a PageHandler Object's "frame" attribute for the name of the web
-        element. If found, that element is located in a frame, and the driver
-        needs to switch it's "active view" to that frame before the element can
-        be interacted with.
+        Looks the name of the web element up in the page object's frame index. If
+        found, that element is located in a frame, and the driver needs to switch
+        it's "active view" to that frame before the element can be interacted with.
         """
-        element = tokens[0].name
-        if page.frame_elements:
-            for fr, elms in page.frame_elements.items():
-                if element.lower() in list(map(lambda x: x.lower(), elms)):
-                    frame = fr
-                    break
-            else:
-                frame = None
-        else:
-            frame = None
-        if frame is not None:
-            driver.switch_to_frame(frame)
-            try:
-                func(driver, page, *tokens)
-            finally:
-                driver.switch_to_default_content()
-        else:
-            func(driver, page, *tokens)
+        switch_to_element_frame(driver, page, tokens[0].name)  # The driver stays in the frame, see FrameTracker
+        func(driver, page, *tokens)
         return func
 
     @__switch_frame
@@ -61,17 +48,12 @@ class AssertionCommands:
         :param arb_text_pattern: The text-pattern to be searched for among the sub-elements within the page_element_container.
         :param default_int_seconds: Number of seconds to continue pinging until the element is considered non-visible.
         """
-        for t in range(default_int_seconds.name):
-            try:
-                elem = _driver.find_element_by_xpath(page_element_container.func)
-                found_elem = elem.find_element_by_xpath('//*[contains(text(), "{}")]'.format(arb_text_pattern.name))
-                if found_elem:
-                    break
-                else:
-                    time.sleep(1)
-            except Exception as err:
-                time.sleep(1)
-        else:
+        xpaths = [page_element_container.func, '//*[contains(text(), "{}")]'.format(arb_text_pattern.name)]
+
+        def find_text():
+            return all(state.present for state in probe_xpaths(_driver, xpaths).values())
+
+        if not poll_until(find_text, default_int_seconds.name):
             m = 'Could not find an element within "{0}" containing the text pattern "{1}"'.format(
                 page_element_container.name,
                 arb_text_pattern.name
@@ -88,13 +70,10 @@ class AssertionCommands:
             optional arbitrary command.
         :param default_int_seconds: Number of seconds to continue pinging until the element is considered non-visible.
         """
-        control = AssertionCommands.control_from_element(_driver, page_element)
-        for t in range(default_int_seconds.name):
-            if control.clickable:
-                break
-            else:
-                time.sleep(1)
-        else:
+        passed, control = AssertionCommands._poll_control(
+            _driver, page_element, lambda c: c.clickable, default_int_seconds.name
+        )
+        if not passed:
             if control.visible and not control.enabled:
                 raise FailedAssertion('Element "{}" is visible but not enabled'.format(page_element.name))
             elif not control.visible and control.enabled:
@@ -109,19 +88,13 @@ class AssertionCommands:
         :param _driver: web driver object
         :param arb_text_expected_amount: User-provided integer which is compared to the UI's reported number of records
         """
-        for i in range(default_int_seconds.name):
-            try:
-                total_records_elem = _driver.find_element_by_xpath('(//div[@class="dijitDialogPaneContent"]//td[@data-dojo-attach-point="_creditsReqNode"])[last()]')
-            except NoSuchElementException:
-                pass
-            else:
-                total_records = total_records_elem.text
-                if str(total_records) == arb_text_expected_amount.name:
-                    break
-                else:
-                    raise FailedAssertion('The expected number of credits is "{0}", not "{1}"'.format(total_records, arb_text_expected_amount.name))
-        else:
+        xpath = '(//div[@class="dijitDialogPaneContent"]//td[@data-dojo-attach-point="_creditsReqNode"])[last()]'
+        state = poll_until(lambda: AssertionCommands._probe_present(_driver, xpath), default_int_seconds.name)
+        if not state:
             raise FailedAssertion('The credit estimator pop-up could not be found.')
+        total_records = state.text
+        if str(total_records) != arb_text_expected_amount.name:
+            raise FailedAssertion('The expected number of credits is "{0}", not "{1}"'.format(total_records, arb_text_expected_amount.name))
 
     @staticmethod
     def assert_total_records(_driver, _, arb_text_expected_amount, default_int_seconds=5):
@@ -130,19 +103,13 @@ class AssertionCommands:
         :param _driver: web driver object
         :param arb_text_expected_amount: User-provided integer which is compared to the UI's reported number of records
         """
-        for i in range(default_int_seconds.name):
-            try:
-                total_records_elem = _driver.find_element_by_xpath('(//div[@class="dijitDialogPaneContent"]//td[@data-dojo-attach-point="_totalRecordsNode"])[last()]')
-            except NoSuchElementException:
-                pass
-            else:
-                total_records = total_records_elem.text
-                if str(total_records) == arb_text_expected_amount.name:
-                    break
-                else:
-                    raise FailedAssertion('The expected number of records is "{0}", not "{1}"'.format(total_records, arb_text_expected_amount.name))
-        else:
+        xpath = '(//div[@class="dijitDialogPaneContent"]//td[@data-dojo-attach-point="_totalRecordsNode"])[last()]'
+        state = poll_until(lambda: AssertionCommands._probe_present(_driver, xpath), default_int_seconds.name)
+        if not state:
             raise FailedAssertion('The credit estimator pop-up could not be found.')
+        total_records = state.text
+        if str(total_records) != arb_text_expected_amount.name:
+            raise FailedAssertion('The expected number of records is "{0}", not "{1}"'.format(total_records, arb_text_expected_amount.name))
 
     @__switch_frame
     def assert_disabled(_driver, _, page_element, default_int_seconds=5):
@@ -152,13 +119,10 @@ class AssertionCommands:
         :param page_element: A page element to be identified.
         :param default_int_seconds: Number of seconds to continue pinging until the element is considered non-disabled.
         """
-        control = AssertionCommands.control_from_element(_driver, page_element)
-        for t in range(default_int_seconds.name):
-            if not control.enabled:
-                break
-            else:
-                time.sleep(1)
-        else:
+        passed, _ = AssertionCommands._poll_control(
+            _driver, page_element, lambda c: not c.enabled, default_int_seconds.name
+        )
+        if not passed:
             raise FailedAssertion('Element "{}" is enabled'.format(page_element.name))
 
     @__switch_frame
@@ -169,13 +133,10 @@ class AssertionCommands:
         :param page_element: A page element to be identified.
         :param default_int_seconds: Number of seconds to continue pinging until the element is considered non-disabled.
         """
-        control = AssertionCommands.control_from_element(_driver, page_element)
-        for t in range(default_int_seconds.name):
-            if control.enabled:
-                break
-            else:
-                time.sleep(1)
-        else:
+        passed, _ = AssertionCommands._poll_control(
+            _driver, page_element, lambda c: c.enabled, default_int_seconds.name
+        )
+        if not passed:
             raise FailedAssertion('Element "{}" is not enabled'.format(page_element.name))
 
     @staticmethod
@@ -186,6 +147,10 @@ class AssertionCommands:
         :param arb_text_pattern: Name of the layer to be searched for
         """
         toc_exp = '//div[@id="tocContentPane"]//div[@id="toc-main"]//div[@class="toc_layer  dojoDndItem"]//table//td//span[@class="toc_name toc_layerName"]'
+        try:
+            find_element(_driver, toc_exp)  # Waits for the table of contents, as the other lookups do
+        except NoSuchElementException:
+            raise ElementNotFoundException("Table of Contents")
         toc_elements = _driver.find_elements_by_xpath(toc_exp)
         if toc_elements:
             for elem in toc_elements:
@@ -206,16 +171,12 @@ class AssertionCommands:
         :param arb_text_pattern: The text-pattern to be searched for among the sub-elements within the page_element_container.
         :param default_int_seconds: Number of seconds to continue pinging until the element is considered non-visible.
         """
-        for t in range(default_int_seconds.name):
-            try:
-                elem = _driver.find_element_by_xpath(page_element_container.func)
-                found_elem = elem.find_element_by_xpath('{0}//*[contains(text(), "{1}")]'.format(page_element_container.func, arb_text_pattern.name))
-                time.sleep(1)
-            except NoSuchElementException:
-                break
-            except Exception as err:
-                time.sleep(1)
-        else:
+        xpath = '{0}//*[contains(text(), "{1}")]'.format(page_element_container.func, arb_text_pattern.name)
+
+        def text_is_absent():
+            return not probe_xpath(_driver, xpath).present  # Also absent if the container is missing
+
+        if not poll_until(text_is_absent, default_int_seconds.name):
             m = 'Found an element within "{0}" containing the text pattern "{1}"'.format(
                 page_element_container.name,
                 arb_text_pattern.name
@@ -230,13 +191,10 @@ class AssertionCommands:
         :param page_element: A page element to be identified.
         :param default_int_seconds: Number of seconds to continue pinging until the element is considered non-invisible.
         """
-        control = AssertionCommands.control_from_element(_driver, page_element)
-        for t in range(default_int_seconds.name):
-            if not control.visible:
-                break
-            else:
-                time.sleep(1)
-        else:
+        passed = AssertionCommands._poll_state(
+            _driver, page_element, lambda s: not s.visible, default_int_seconds.name
+        )
+        if not passed:
             raise FailedAssertion('Element "{}" is visible'.format(page_element.name))
 
     @__switch_frame
@@ -249,17 +207,11 @@ class AssertionCommands:
         :param arb_text: Expected text value of the provided element.
         :param default_int_seconds: Number of seconds to continue pinging until the element's text is read.
         """
-        for t in range(default_int_seconds.name):
-            try:
-                element = _driver.find_element_by_xpath(page_element.func)
-                elem_text = element.text or element.get_attribute('value')
-                if elem_text == arb_text.name:
-                    break
-                else:
-                    time.sleep(1)
-            except Exception:
-                time.sleep(1)
-        else:
+        def text_matches():
+            state = probe_xpath(_driver, page_element.func)
+            return state.present and (state.text or state.value) == arb_text.name
+
+        if not poll_until(text_matches, default_int_seconds.name, ignored_exceptions=(Exception,)):
             m = '{0}\'s text is not equal to "{1}"'.format(page_element.name, arb_text.name)
             raise FailedAssertion(m)
 
@@ -272,17 +224,14 @@ class AssertionCommands:
         :param page_title: Contains the user-expected title of the current page.
         :param default_int_seconds: Number of seconds to continue pinging until the element is considered non-visible.
         """
-        for t in range(default_int_seconds.name):
-            try:
-                driver_title = _driver.title.strip()
-                if driver_title == page_title:
-                    break
-                else:
-                    time.sleep(1)
-            except Exception:
-                time.sleep(1)
-        else:
-            m = 'Page title "{0}" does not equal {1}'.format(driver_title, page_title.name)
+        titles = [None]  # Last title read, for the failure message
+
+        def title_matches():
+            titles[-1] = _driver.title.strip()
+            return titles[-1] == page_title.name
+
+        if not poll_until(title_matches, default_int_seconds.name, ignored_exceptions=(Exception,)):
+            m = 'Page title "{0}" does not equal {1}'.format(titles[-1], page_title.name)
             raise FailedAssertion(m)
 
     @__switch_frame
@@ -295,15 +244,61 @@ class AssertionCommands:
         :param page_element: A page element to be identified.
         :param default_int_seconds: Number of seconds to continue pinging until the element is considered non-visible.
         """
-        control = AssertionCommands.control_from_element(_driver, page_element)
-        for t in range(default_int_seconds.name):
-            if control.visible:
-                break
-            else:
-                time.sleep(1)
-        else:
+        passed = AssertionCommands._poll_state(
+            _driver, page_element, lambda s: s.visible, default_int_seconds.name
+        )
+        if not passed:
             raise FailedAssertion('Element "{}" is not visible'.format(page_element.name))
 
+    @staticmethod
+    def _poll_control(_driver, page_element, predicate, seconds):
+        """
+        Reads the element's control object again on every poll, since a control's
+        properties are only evaluated once.
+        :param _driver: Web-driver object.
+        :param page_element: A page element.
+        :param predicate: function which accepts a control object and returns a bool.
+        :param seconds: Number of seconds to keep polling.
+        :return: (bool, control) whether the predicate passed, and the last control read.
+        """
+        controls = [None]
+
+        def check():
+            controls[-1] = AssertionCommands.control_from_element(_driver, page_element)
+            return predicate(controls[-1])
+
+        return bool(poll_until(check, seconds)), controls[-1]
+
+    @staticmethod
+    def _poll_state(_driver, page_element, predicate, seconds):
+        """
+        Polls the element's state with one script call per poll, see DomProbe.
+        :param _driver: Web-driver object.
+        :param page_element: A page element.
+        :param predicate: function which accepts an ElementState and returns a bool.
+        :param seconds: Number of seconds to keep polling.
+        :return: (bool) whether the predicate passed; raises ElementNotFoundException
+            if the element was never present.
+        """
+        states = [MISSING]
+
+        def check():
+            states[-1] = probe_xpath(_driver, page_element.func)
+            return states[-1].present and predicate(states[-1])
+
+        passed = bool(poll_until(check, seconds))
+        if not states[-1].present:
+            raise ElementNotFoundException(page_element.name)
+        return passed
+
+    @staticmethod
+    def _probe_present(_driver, xpath):
+        """
+        :return: (ElementState) state of the element, or None if it is missing, for poll_until.
+        """
+        state = probe_xpath(_driver, xpath)
+        return state if state.present else None
+
     @staticmethod
     def control_from_element(_driver, page_element):
         """
@@ -312,21 +307,28 @@ class AssertionCommands:
         :param page_element: A page element
         """
         try:
-            element = _driver.find_element_by_xpath(page_element.func)
+            return perform(_driver, page_element.func, AssertionCommands._control_from_web_element)
         except NoSuchElementException:
             raise ElementNotFoundException(page_element.name)
+
+    @staticmethod
+    def _control_from_web_element(element):
+        """
+        Builds the control object for a WebElement. Its snapshot is taken with one script
+        call, so a stale element raises StaleElementReferenceException here rather than later.
+        :param element: WebElement.
+        """
         # Initialize a control object
         control = ControlBase(element)
-        # If element has dijit parent, then use the dijit parent to get the control's clases. This is
-        # used to figure out control's type.
-        element = control.element if control.dijit_parent_element is None else control.dijit_parent_element
-        class_attrs = element.get_attribute("class").split(" ")
+        # The snapshot's class is the dijit parent's, if the element has one. This is used to
+        # figure out control's type.
+        class_attrs = control.snapshot.class_name.split(" ")
         if "dijitTimeTextBox" in class_attrs:
             # TimeTextBox control has a class named dijitTimeTextBox
-            return TimeTextBox(element)
+            return control.dijit_parent_control(TimeTextBox)
         elif "dijitButton" in class_attrs:
             # Button control has a class named dijitButton
-            return Button(element)
+            return control.dijit_parent_control(Button)
         else:
             # If none supporting object is detected, using the base control object.
             return control
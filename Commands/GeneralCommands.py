@@ -4,6 +4,9 @@ import time
 
 sys.path.append([os.sep.join(os.getcwd().split(os.sep)[:-1]), 'Stuff'])
 
+from Commands.AssertionCommands import FailedAssertion
+from SessionClasses.AssertionGroup import AssertionGroup
+
 
 class GeneralCommands:
     """
@@ -13,6 +16,36 @@ class GeneralCommands:
         'help': ['all', 'assertion', 'browser', 'general', 'page', 'window'],
     }
 
+    @staticmethod
+    def assert_group_start(_session):
+        """
+        Starts an assertion group. Assertions which follow are collected instead of
+        run, until assert_group_end runs them all together.
+        :param _session: Session object.
+        """
+        if _session.assertion_group is not None:
+            print("An assertion group is already active. To run it, use: assert_group_end.")
+        else:
+            _session.assertion_group = AssertionGroup()
+
+    @staticmethod
+    def assert_group_end(_session):
+        """
+        Runs the assertions collected since assert_group_start within one shared
+        deadline, and reports every assertion which failed, see AssertionGroup.
+        :param _session: Session object.
+        """
+        group, _session.assertion_group = _session.assertion_group, None
+        if group is None:
+            print("An assertion group is not active. To start one, use: assert_group_start.")
+            return
+        failures = group.run(_session.portal.driver)
+        if failures:
+            lines = ['    {0}: {1} {2}'.format(text, err.__class__.__name__, err) for text, err in failures]
+            raise FailedAssertion('{0} of {1} grouped assertions failed:\n{2}'.format(
+                len(failures), len(group.assertions), '\n'.join(lines)
+            ))
+
     @staticmethod
     def end_save(_session):
         """
@@ -1,5 +1,5 @@
 from ControlObjects.ControlBase import ControlBase
 
 class Button(ControlBase):
-    def __init__(self, element):
-        ControlBase.__init__(self, element)
\ No newline at end of file
+    def __init__(self, element, snapshot=None):
+        ControlBase.__init__(self, element, snapshot)
\ No newline at end of file
@@ -1,68 +1,95 @@
-def lazy_property(fn):
-    '''Decorator that makes a property lazy-evaluated.
-    '''
-    attr_name = '_lazy_' + fn.__name__
+import collections
+import pkgutil
+
+# The atom WebElement.is_displayed runs, read from selenium's package data as selenium does,
+# rather than through a module global which later selenium versions only set on first use
+IS_DISPLAYED_JS = pkgutil.get_data('selenium.webdriver.remote', 'isDisplayed.js').decode('utf8')
+
+# dijit_parent: the element itself, its closest ancestor with a "dijit" class, or None.
+# class_name: class of the dijit parent, or of the element if it has none. enabled is read
+# from that same element. visible: the element is displayed; parent_visible: the dijit parent is.
+ControlSnapshot = collections.namedtuple(
+    'ControlSnapshot', ['dijit_parent', 'class_name', 'enabled', 'visible', 'parent_visible']
+)
+
+# Returns the dijit parent of an element, or null. Follows the rules of the WebElement calls
+# it replaces: an element without a class attribute, or an ancestor without one on the way
+# up, has no dijit parent. Shared with DomProbe, so both find the same parent.
+DIJIT_PARENT_JS = """function (element) {
+    function classTokens(elem) {
+        var value = elem.getAttribute('class');
+        return value === null ? null : value.split(' ');
+    }
+    var tokens = classTokens(element);
+    if (tokens !== null && tokens.indexOf('dijit') >= 0) {
+        return element;
+    } else if (tokens !== null && tokens.some(function (t) { return t.indexOf('dijit') >= 0; })) {
+        for (var up = element.parentElement; up; up = up.parentElement) {
+            var upTokens = classTokens(up);
+            if (upTokens === null) {
+                break;
+            } else if (upTokens.indexOf('dijit') >= 0) {
+                return up;
+            }
+        }
+    }
+    return null;
+}"""
+
+# arguments[0]: the control's element. Returns the fields of a ControlSnapshot, in order.
+# isDisplayed is the script WebElement.is_displayed runs, so visibility is judged exactly
+# the same way.
+SNAPSHOT_SCRIPT = """
+var isDisplayed = (%s);
+var dijitParent = (%s);
+var element = arguments[0];
+var parent = dijitParent(element);
+var control = parent || element;
+var className = control.getAttribute('class') || '';
+var enabled = !(control.matches && control.matches(':disabled')) && className.indexOf('Disabled') < 0;
+return [parent, className, enabled, isDisplayed(element), control === element ? null : isDisplayed(control)];
+""" % (IS_DISPLAYED_JS, DIJIT_PARENT_JS)
 
-    @property
-    def _lazy_property(self):
-        if not hasattr(self, attr_name):
-            setattr(self, attr_name, fn(self))
-        return getattr(self, attr_name)
-    return _lazy_property
+
+def take_snapshot(element):
+    """
+    Reads everything a control needs to know about an element with one script call.
+    :param element: WebElement of the control.
+    :return: ControlSnapshot.
+    """
+    parent, class_name, enabled, visible, parent_visible = element.parent.execute_script(SNAPSHOT_SCRIPT, element)
+    return ControlSnapshot(parent, class_name, enabled, visible, visible if parent_visible is None else parent_visible)
 
 
 class ControlBase(object):
-    def __init__(self, element):
+    def __init__(self, element, snapshot=None):
+        '''
+        :param element: WebElement of the control.
+        :param snapshot: ControlSnapshot of the element, if it has already been taken.
+        '''
         self.element = element
-        self.dijit_parent_element = self.get_dijit_parent(element)
+        self.snapshot = take_snapshot(element) if snapshot is None else snapshot
+        self.dijit_parent_element = self.snapshot.dijit_parent
 
-    def get_dijit_parent_from_child(self, element):
-        try:
-            parent = element.find_element_by_xpath('..')
-            if "dijit" not in parent.get_attribute("class").split(" "):
-                parent = self.get_dijit_parent_from_child(parent)
-            return parent
-        except:
-            raise Exception("Did not find the dijit parent element from dijit child control.")
+    def dijit_parent_control(self, control_class):
+        '''Builds a control of another class for the dijit parent (or the element, if it has
+        none) from this control's snapshot, without reading the page again.
+        '''
+        if self.dijit_parent_element is None:
+            return control_class(self.element, self.snapshot)
+        # The dijit parent is its own dijit parent, and is visible if it is displayed
+        snapshot = self.snapshot._replace(visible=self.snapshot.parent_visible)
+        return control_class(self.dijit_parent_element, snapshot)
 
-    def get_dijit_parent(self, element):
-        try:
-            class_attrs = element.get_attribute("class").split(" ")
-            if "dijit" in class_attrs:
-                # If the control is already a dijit parent, directly return
-                return element
-            elif any("dijit" in x for x in class_attrs):
-                # If control has dijit as part of the class attribute, then it has a dijit parent. 
-                # Recursively seach all the way up to find the dijit parent.
-                # This relies on the XPath for a control points to an element that has dijit as part of the class attribute. 
-                # If someone uses a tr for XPath, it might not have this class attribute and this will not work.
-                return self.get_dijit_parent_from_child(element)
-            else:
-                 # If control is not using a dijit template at all, then the dijit parent is None.
-                return None
-        except:
-            return None
-    
-    @lazy_property
+    @property
     def enabled(self):
-        try:
-            # If element has a dijit parent, then use the dijit parent to get the enabled status. 
-            # Otherwise use the element itself to get the enabled status.
-            element = self.element if self.dijit_parent_element is None else self.dijit_parent_element
-            if element.is_enabled() and "Disabled" not in element.get_attribute("class"):
-                return True
-        except:
-            raise Exception("Could not check enabled status for: {}".format(self.element.name))
-        return False
+        # If element has a dijit parent, then the dijit parent gives the enabled status.
+        return self.snapshot.enabled
 
-    @lazy_property
+    @property
     def visible(self):
-        try:
-            return self.element.is_displayed()
-        except:
-            raise Exception("Could not check visible status for: {}".format(self.element.name))
+        return self.snapshot.visible
 
-    @lazy_property
+    @property
     def clickable(self):
         return self.enabled and self.visible
-
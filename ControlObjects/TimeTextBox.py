@@ -1,8 +1,8 @@
 from ControlObjects.ControlBase import ControlBase
 
 class TimeTextBox(ControlBase):
-    def __init__(self, element):
-        ControlBase.__init__(self, element)
+    def __init__(self, element, snapshot=None):
+        ControlBase.__init__(self, element, snapshot)
 
     @property
     def Items(self, element):
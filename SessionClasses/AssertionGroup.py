@@ -0,0 +1,114 @@
+"""
+Runs a group of assertions together, within one shared deadline.
+
+Assertions between assert_group_start and assert_group_end are collected
+instead of run, see CommandHandler.run_command. assert_group_end then polls them
+together: every poll checks each pending assertion once, and an assertion is
+done as soon as it passes, or fails once its own number of seconds has passed
+since the group started. A group of independent assertions therefore takes
+about as long as its slowest assertion, rather than the sum of all of them.
+
+The page elements of the pending assertions are probed with one script call
+per frame at the start of every poll, so assertions which read an element's
+state, such as assert_visible and assert_text, share that call, see
+DomProbe.batched_probes. Every failure is reported once the group is done.
+"""
+
+import collections
+import time
+
+from .CommandHandler import Token
+from .DomProbe import batched_probes
+from .FrameTracker import get_frame_index
+from .WaitCommands import poll_until
+
+SECONDS_ARG = 'default_int_seconds'
+
+# command_group: validated tokens of the assertion; page_object: the page it was given on;
+# seconds: how long it may take to pass; check_tokens: its arguments, with 0 seconds.
+GroupedAssertion = collections.namedtuple(
+    'GroupedAssertion', ['command_group', 'page_object', 'seconds', 'check_tokens']
+)
+
+
+def get_seconds_position(command_group):
+    """
+    :param command_group: (tuple - Token) an assertion and its arguments.
+    :return: (int) position of the seconds argument in the group, or None if the
+        assertion does not take one.
+    """
+    default_args = list(command_group[0].default_args)
+    if SECONDS_ARG not in default_args:
+        return None
+    position = 1 + len(command_group[0].args) + default_args.index(SECONDS_ARG)
+    return position if position < len(command_group) else None
+
+
+class AssertionGroup:
+    """
+    Assertions collected between assert_group_start and assert_group_end.
+    """
+    def __init__(self):
+        self.assertions = list()
+
+    def add(self, command_group, page_object):
+        """
+        :param command_group: (tuple - Token) a validated assertion and its arguments.
+        :param page_object: current page object, which the assertion is run against.
+        """
+        position = get_seconds_position(command_group)
+        if position is None:
+            seconds, check_tokens = 0, command_group[1:]
+        else:
+            # Each check of the group only looks once; the group does the waiting
+            seconds = command_group[position].name
+            check_tokens = command_group[1:position] + (Token(0, 'INTEGER'),) + command_group[position + 1:]
+        self.assertions.append(GroupedAssertion(command_group, page_object, seconds, check_tokens))
+
+    def run(self, driver):
+        """
+        Polls every assertion until each has passed or run out of time.
+        :param driver: Web driver object.
+        :return: (list - tuples) each failed assertion's text and the exception of its last check.
+        """
+        start = time.monotonic()
+        pending = list(range(len(self.assertions)))  # Positions in self.assertions
+        errors = dict()  # Exception raised by the last check, keyed by position
+        failed = list()
+
+        def check():
+            now = time.monotonic()
+            with batched_probes(driver, self.get_xpaths_by_frame([self.assertions[i] for i in pending])):
+                for i in list(pending):
+                    assertion = self.assertions[i]
+                    try:
+                        assertion.command_group[0].func(driver, assertion.page_object, *assertion.check_tokens)
+                    except Exception as err:  # Any exception fails this check, as it would fail the line
+                        errors[i] = err
+                        if now - start >= assertion.seconds:
+                            pending.remove(i)
+                            failed.append(i)
+                    else:
+                        pending.remove(i)
+            return not pending
+
+        poll_until(check, max([a.seconds for a in self.assertions] + [0]))
+        failed.extend(pending)  # Still failing when the group ran out of time
+        return [
+            (' '.join(str(t.name) for t in self.assertions[i].command_group), errors[i]) for i in sorted(failed)
+        ]
+
+    @staticmethod
+    def get_xpaths_by_frame(assertions):
+        """
+        :param assertions: (list - GroupedAssertion) assertions still pending.
+        :return: (dict) XPath expressions of their page elements, keyed by frame.
+        """
+        xpaths_by_frame = dict()
+        for assertion in assertions:
+            element = assertion.command_group[1] if len(assertion.command_group) > 1 else None
+            if element is not None and element.type in ['PAGE_ELEMENT', 'WINDOWED_ELEMENT'] \
+                    and isinstance(element.func, str):
+                frame = get_frame_index(assertion.page_object).get(element.name.lower())
+                xpaths_by_frame.setdefault(frame, list()).append(element.func)
+        return xpaths_by_frame
@@ -6,14 +6,19 @@ organizing assertion files, instantiating page and commands objects, and logging
 from datetime import datetime
 import logging
 import logging.handlers
+import multiprocessing
+import multiprocessing.util
 import os
 import sys
 import time
 
 from SessionClasses.PageHandler import PageHandler
-from SessionClasses.PortalHandler import Portal
+from SessionClasses.PortalHandler import PortalPool
 from .CommandHandler import CommandHandler
 from .DatabaseManager import Database
+from .PageTracker import PageTracker
+from .Registry import get_registry
+from .TestCompiler import TestCompiler
 from .TestHandler import TestHandler
 
 
@@ -22,7 +27,8 @@ class AutomatedSession:
     Handles automation of running test files. Configured in main.py.
     """
     def __init__(self, assertion_levels, verbose, log_file_dir, test_file_dir, parameters,
-                 browsers, selected_test_files, database, tasks):
+                 browsers, selected_test_files, database, tasks, workers=1, portal_reuse_limit=25,
+                 explicit_waits=False, settle_timeout=5, fast_fill=False, settle_quiet_ms=150):
         """
         Handles validation of all parameters from main.py as well as test file
         content. Calls functions for running test files.
@@ -39,30 +45,55 @@ class AutomatedSession:
         :param selected_test_files: (list - strings) the only test files to run during the test session.
         :param database: (str) if used, posts results to the specified database.
         :param tasks: (dictionary) folder structure to follow when parsing for test files.
+        :param workers: (int) number of test files to run at once, each in its own process and browser.
+        :param portal_reuse_limit: (int) number of test files a browser runs before it is replaced.
+        :param explicit_waits: (bool) if True, browsers run without an implicit wait, see Portal.
+        :param settle_timeout: (int) longest wait for the page to settle after a click or submit.
+        :param fast_fill: (bool) if True, fill and fill_unique set values with a script, see FastFill.
+        :param settle_quiet_ms: (int) milliseconds the page must not change to count as settled.
         """
         os.chdir(os.sep.join(os.path.dirname(os.path.realpath(__file__)).split(os.sep)[:-1]))
         self.arg_commands = dict()
+        self.assertion_group = None
         self.commands = None
         self.current_page_object = None
+        self.database = None
         self.end_time_ms = None
+        self.explicit_waits = explicit_waits
+        self.fast_fill = fast_fill
         self.failed_tests = dict()
         self.log = None
         self.log_file_dir = log_file_dir
         self.pages = None
         self.portal = None
+        self.portal_pool = None
+        self.portal_reuse_limit = portal_reuse_limit
+        self.settle_quiet_ms = settle_quiet_ms
+        self.settle_timeout = settle_timeout
         self.successful_tests = dict()
         self.start_time_ms = None
         self.test_file_dir = test_file_dir
         self.test_manager = None
+        self.test_compiler = None
         self.test_results = dict()
         self.try_mode = False
         self.verbose = verbose
+        self.workers = workers
 
         # Parameter-validation functions which will exit the program if any errors occur
         self.validate_log_file_path(log_file_dir)
         self.validate_browsers(browsers)
         self.validate_assertion_levels(assertion_levels)
 
+        # Import commands and page objects once; forked workers inherit the registry
+        get_registry()
+        self.pages = PageHandler()
+        self.pages.set_page_objects()
+        self.test_compiler = TestCompiler()
+
+        # Results are written as each test file finishes, see Database
+        self.database = Database(database) if database else None
+
         # Iterate over main.py parameters and create log file prior to running tests
         for params_name, params_dict in parameters.items():
             if not self.validate_parameters(params_dict):  # raises an except. if anything's wrong, so we can assume set_params will work next
@@ -88,25 +119,101 @@ class AutomatedSession:
                     else:
                         self.endpoint = params_dict['endpoint']
 
-                        # Get each test file, validate it, and run it
-                        for test_file, analysis_category, tool in self.test_manager.get_next_test_file():
-                            self.set_test_results(analysis_category, tool)
-                            if self.validate_test_file(test_file):
-                                self.run_test_file(test_file, analysis_category, tool)
+                        # Compile every test file so syntax errors are reported before a browser starts
+                        test_files = self.get_valid_test_files(self.test_manager.get_next_test_file())
+                        if self.database is not None:
+                            self.database.start_session(
+                                self.current_assertion_level, self.start_time_ms, self.endpoint,
+                                self.arg_commands.get('arg_0')
+                            )
+                        try:
+                            if self.workers > 1:
+                                self.run_test_files_in_pool(test_files)
                             else:
-                                self.log.error("INVALID TEST FILE : {}".format(test_file))
-                        self.end_time_ms = time.time()
+                                self.portal_pool = PortalPool(
+                                    browser_name, self.endpoint, self.portal_reuse_limit, self.explicit_waits,
+                                    self.settle_timeout, self.fast_fill, self.settle_quiet_ms
+                                )
+                                try:
+                                    for test_file, analysis_category, tool in test_files:
+                                        file_start = time.monotonic()
+                                        self.run_test_file_safely(test_file, analysis_category, tool)
+                                        self.record_result(
+                                            analysis_category, tool, self.get_test_file_name(test_file),
+                                            time.monotonic() - file_start
+                                        )
+                                finally:
+                                    self.portal_pool.close()
+                        finally:
+                            # Finalize the session row even if the session crashed
+                            self.end_time_ms = time.time()
+                            if self.database is not None:
+                                self.database.finish_session(self.start_time_ms, self.end_time_ms)
                         self.log.info("\nEND OF SESSION")
 
-                        # Update Database
-                        if database:
-                            Database(self, database)
+        if self.database is not None:
+            self.database.close()
+
+    def get_valid_test_files(self, test_files):
+        """
+        Compiles each test file and logs the errors of any invalid ones.
+        :param test_files: iterable of (test file path, analysis category, tool) tuples.
+        :return: (list - tuples) the valid test files, in the same format.
+        """
+        valid_test_files = list()
+        for test_file, analysis_category, tool in test_files:
+            self.set_test_results(analysis_category, tool)
+            if self.validate_test_file(test_file):
+                valid_test_files.append((test_file, analysis_category, tool))
+            else:
+                self.log.error("INVALID TEST FILE : {}".format(test_file))
+        return valid_test_files
+
+    @staticmethod
+    def get_test_file_name(test_file):
+        """
+        :param test_file: (str) full path to the test file.
+        :return: (str) name the test file's result is recorded under.
+        """
+        return test_file.split('\\')[-1]
+
+    def record_result(self, analysis_category, tool, test_file_name, duration):
+        """
+        Writes the result of a finished test file to the database, if one is used.
+        :param analysis_category: category of the tool.
+        :param tool: tool the test file tests.
+        :param test_file_name: (str) see get_test_file_name.
+        :param duration: (float) seconds the test file took.
+        """
+        if self.database is None:
+            return
+        result = self.test_results[self.current_assertion_level][self.current_browser][analysis_category][tool].get(test_file_name)
+        if result is not None:
+            self.database.record_result(analysis_category, tool, test_file_name, result, duration)
+
+    def run_test_file_safely(self, test_file, analysis_category, tool):
+        """
+        Runs a test file with run_test_file, and records an unexpected error which
+        escapes it as the file's failure, so the remaining test files still run.
+        :param test_file: (str) full path to the test file.
+        :param analysis_category: current category of the tool.
+        :param tool: current tool being tested.
+        """
+        try:
+            self.run_test_file(test_file, analysis_category, tool)
+        except Exception:
+            self.log.error('    {0} {1}'.format(sys.exc_info()[0].__name__, sys.exc_info()[1]))
+            self.test_results[self.current_assertion_level][self.current_browser][analysis_category][tool].setdefault(
+                self.get_test_file_name(test_file), 'FAIL: {0} -- {1}'.format(sys.exc_info()[0].__name__, sys.exc_info()[1])
+            )
 
     def run_test_file(self, test_file, analysis_category, tool):
         """
         Iterate and run through all commands in test file.
-        Requires a new browser for each test, and available commands must be updated
-        after each command is run.
+        Leases a reset browser from the session's PortalPool for each test, and
+        available commands must be updated after each command is run. A browser
+        which stopped responding, which a failed line only reports as a FAIL, is
+        not returned to the pool.
         At this point we are sharing work flows with InteractiveManager.
         :param analysis_category: current category of the tool. Used here to update
             the test_results dict.
@@ -114,65 +221,110 @@ class AutomatedSession:
             dict.
         :param test_file: (str) full path to the test file.
         """
-        self.portal = Portal(self.current_browser, self.endpoint)
+        self.portal = self.portal_pool.lease()
+        try:
+            self.run_test_file_commands(test_file, analysis_category, tool)
+        except Exception:
+            self.portal_pool.release(self.portal, crashed=True)
+            raise
+        else:
+            self.portal_pool.release(self.portal, crashed=not self.portal.responding())
 
+    def run_test_file_commands(self, test_file, analysis_category, tool):
+        """
+        Runs each line of the test file in the leased browser, which PortalPool.lease
+        has already pointed at the endpoint, and records the result.
+        :param test_file: (str) full path to the test file.
+        :param analysis_category: current category of the tool.
+        :param tool: current tool being tested.
+        """
         self.commands = CommandHandler()
         self.commands.set_static_commands(self)
 
-        self.pages = PageHandler()
-        self.pages.set_page_objects()
-
-        self.portal.navigate_to_page(self.endpoint)
-
         self.portal.driver.test = dict()  # Used for fill-unique command
-
-        with open(test_file, 'r') as file_content:
-            test_file_path = test_file.split(self.test_file_dir)[1]
-            self.log.info('\n* FILE: {}'.format(test_file_path))
-            test_file_name = test_file.split('\\')[-1]
-            for e, line in enumerate(file_content):
-                if line == '\n' or line.startswith('#'):
+        self.assertion_group = None  # A file which failed inside a group leaves it open
+
+        plan = self.test_compiler.compile(test_file)
+        test_file_path = test_file.split(self.test_file_dir)[1]
+        self.log.info('\n* FILE: {}'.format(test_file_path))
+        test_file_name = self.get_test_file_name(test_file)
+        page_tracker = PageTracker()
+        for plan_line in plan.lines:
+            page_tracker.update(self)
+            # Run the commands, report any errors/exceptions
+            try:
+                if self.verbose:
+                    print("{0}{1}".format("try: " if self.try_mode else '', plan_line.text))
+                self.commands.execute_plan_line(plan_line, self)
+            except Exception:  # Accepts any Exception to prevent crashes and log useful info
+                if self.try_mode:
                     pass
                 else:
-                    line = line.strip('\n')
-                    self.current_page_object = self.pages.get_current_page(self.portal)
-                    self.commands.set_current_page_commands(self.current_page_object)
-                    self.commands.set_visible_element_commands(self.portal, self.current_page_object)
-                    self.pages.verify_page_has_loaded(self.current_page_object, self.portal)
-                    # Run the commands, report any errors/exceptions
+                    self.log.exception(
+                        msg='    {0} {1}'.format(sys.exc_info()[0].__name__, sys.exc_info()[1]),
+                        exc_info=False,
+                        stack_info=False
+                    )
+                    self.log.error("    Line {0}: {1}".format(plan_line.line_number, plan_line.text))
+                    self.test_results[self.current_assertion_level][self.current_browser][analysis_category][tool].setdefault(
+                        test_file_name, 'FAIL: {0} -- {1}'.format(sys.exc_info()[0].__name__, sys.exc_info()[1])
+                    )
+                    screenshot_file_path = os.path.join(self.log_file_dir, test_file_name.split('.')[0] + '.png')
                     try:
-                        if self.verbose:
-                            print("{0}{1}".format("try: " if self.try_mode else '', line))
-                        self.commands.execute_command(line, self)
-                    except Exception:  # Accepts any Exception to prevent crashes and log useful info
-                        if self.try_mode:
-                            pass
-                        else:
-                            self.log.exception(
-                                msg='    {0} {1}'.format(sys.exc_info()[0].__name__, sys.exc_info()[1]),
-                                exc_info=False,
-                                stack_info=False
-                            )
-                            self.log.error("    Line {0}: {1}".format(e+1, line))
-                            self.test_results[self.current_assertion_level][self.current_browser][analysis_category][tool].setdefault(
-                                test_file_name, 'FAIL: {0} -- {1}'.format(sys.exc_info()[0].__name__, sys.exc_info()[1])
-                            )
-                            screenshot_file_path = os.path.join(self.log_file_dir, test_file_name.split('.')[0] + '.png')
-                            try:
-                                os.remove(screenshot_file_path)
-                            except FileNotFoundError:
-                                pass
-                            finally:
-                                self.portal.driver.get_screenshot_as_file(screenshot_file_path)
-                            break  # Stop iteration of test file
-            else:
-                self.log.info("* Pass")
-                self.test_results[self.current_assertion_level][self.current_browser][analysis_category][tool].setdefault(
-                    test_file_name, 'PASS'
-                )
-
-            # self.log.info("PASS")  # No exception was thrown, test passed
-            self.portal.close_window()
+                        os.remove(screenshot_file_path)
+                    except FileNotFoundError:
+                        pass
+                    finally:
+                        self.portal.driver.get_screenshot_as_file(screenshot_file_path)
+                    break  # Stop iteration of test file
+        else:
+            self.log.info("* Pass")
+            self.test_results[self.current_assertion_level][self.current_browser][analysis_category][tool].setdefault(
+                test_file_name, 'PASS'
+            )
+        self.log.info("* Page refreshes: {0} run, {1} skipped".format(page_tracker.refreshes, page_tracker.skipped))
+        for line in self.portal.settle_stats.get_summary():
+            self.log.info("* Settle time, {0}".format(line))
+        self.portal.settle_stats.reset()
+        self.log.info("* Element cache: {0}".format(self.portal.element_cache.get_summary()))
+        self.portal.element_cache.reset_stats()
+        self.log.info("* Frame switches: {0}".format(self.portal.frame_tracker.get_summary()))
+        self.portal.frame_tracker.reset_stats()
+
+    def run_test_files_in_pool(self, test_files):
+        """
+        Fans the test files out to a pool of worker processes. Each worker owns its
+        own Portal, so files run in parallel browsers. Results and log messages are
+        sent back per test file and merged here, so the log keeps each file's output
+        together and test_results matches the serial run.
+        :param test_files: (list - tuples) valid test file path, analysis category and tool.
+        """
+        worker_config = {
+            'arg_commands': self.arg_commands,
+            'current_assertion_level': self.current_assertion_level,
+            'current_browser': self.current_browser,
+            'endpoint': self.endpoint,
+            'explicit_waits': self.explicit_waits,
+            'fast_fill': self.fast_fill,
+            'log_file_dir': self.log_file_dir,
+            'portal_reuse_limit': self.portal_reuse_limit,
+            'settle_quiet_ms': self.settle_quiet_ms,
+            'settle_timeout': self.settle_timeout,
+            'test_file_dir': self.test_file_dir,
+            'verbose': self.verbose
+        }
+        pool = multiprocessing.Pool(processes=self.workers, initializer=init_worker, initargs=(worker_config,))
+        try:
+            for analysis_category, tool, results, duration, log_records in pool.imap_unordered(run_test_file_in_worker, test_files):
+                for level, message in log_records:
+                    self.log.log(level, message)
+                tool_results = self.test_results[self.current_assertion_level][self.current_browser][analysis_category][tool]
+                for test_file_name, result in results.items():
+                    tool_results.setdefault(test_file_name, result)
+                    self.record_result(analysis_category, tool, test_file_name, duration)
+        finally:
+            pool.close()
+            pool.join()
 
     def set_log(self, log_file_dir):
         """
@@ -297,20 +449,103 @@ class AutomatedSession:
                 "Please create the directory or specify an existing one.".format(log_file_dir)
             sys.exit(m)
 
-    @staticmethod
-    def validate_test_file(test_file):
+    def validate_test_file(self, test_file):
         """
-        Checks file for known errors and prevents running/parsing broken test files.
+        Compiles the test file and logs each line which could not be compiled.
+        This prevents running broken test files, and the compiled plan is cached
+        for run_test_file.
         :param test_file: (str) path to file to be tested.
-        :return: (bool, str) True and '' if no errors are found, False and error message otherwise.
-        ToDo: Collect common errors after test-writing session on 6/14
-        ToDo: Finish this
+        :return: (bool) True if no errors are found, False otherwise.
         """
-        if True:
-            return True, ''
-        else:
-            m = 'Test file is invalid for the following reason: ToDo'
-            return False, m
+        plan = self.test_compiler.compile(test_file)
+        for line_number, line, message in plan.errors:
+            self.log.error("    Line {0}: {1}\n    {2}".format(line_number, line, message))
+        return not plan.errors
+
+
+class AutomatedWorker(AutomatedSession):
+    """
+    Runs test files inside a worker process of AutomatedSession.run_test_files_in_pool.
+    """
+    def __init__(self, config):
+        """
+        Copies the parent session's settings without starting a session loop.
+        Log messages are buffered so they can be sent back to the parent session.
+        :param config: (dict) picklable session attributes from the parent session.
+        """
+        self.assertion_group = None
+        self.commands = None
+        self.current_page_object = None
+        self.pages = PageHandler()
+        self.pages.set_page_objects()
+        self.portal = None
+        self.test_compiler = TestCompiler()
+        self.test_results = dict()
+        self.try_mode = False
+        for attr, value in config.items():
+            setattr(self, attr, value)
+
+        self.log_handler = BufferedLogHandler()
+        self.log = logging.getLogger('worker.{}'.format(os.getpid()))
+        self.log.setLevel(logging.DEBUG)
+        self.log.propagate = False
+        self.log.addHandler(self.log_handler)
+
+        # Pool workers exit without running atexit hooks, so quit the browsers with a finalizer
+        self.portal_pool = PortalPool(
+            self.current_browser, self.endpoint, self.portal_reuse_limit, self.explicit_waits,
+            self.settle_timeout, self.fast_fill, self.settle_quiet_ms
+        )
+        multiprocessing.util.Finalize(self, self.portal_pool.close, exitpriority=10)
+
+    def run_isolated_test_file(self, test_file, analysis_category, tool):
+        """
+        Runs a single test file and collects everything the parent needs to merge.
+        :return: (tuple) analysis category, tool, the file's results, the seconds it took and its log records.
+        """
+        self.test_results = dict()
+        self.set_test_results(analysis_category, tool)
+        start = time.monotonic()
+        self.run_test_file_safely(test_file, analysis_category, tool)  # Crashes are reported in the parent's log
+        results = self.test_results[self.current_assertion_level][self.current_browser][analysis_category][tool]
+        return analysis_category, tool, results, time.monotonic() - start, self.log_handler.pop_records()
+
+
+class BufferedLogHandler(logging.Handler):
+    """
+    Keeps formatted log messages in memory until they are collected.
+    """
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.setFormatter(logging.Formatter('%(message)s'))
+        self.records = list()
+
+    def emit(self, record):
+        self.records.append((record.levelno, self.format(record)))
+
+    def pop_records(self):
+        records, self.records = self.records, list()
+        return records
+
+
+_worker_session = None  # Set in each worker process by init_worker
+
+
+def init_worker(config):
+    """
+    Pool initializer; creates the worker process' session.
+    :param config: (dict) picklable session attributes from the parent session.
+    """
+    global _worker_session
+    _worker_session = AutomatedWorker(config)
+
+
+def run_test_file_in_worker(test_file_info):
+    """
+    Pool task; runs one test file in the worker process' session.
+    :param test_file_info: (tuple) test file path, analysis category and tool.
+    """
+    return _worker_session.run_isolated_test_file(*test_file_info)
 
 
 class LogLady:
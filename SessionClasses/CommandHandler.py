@@ -1,12 +1,24 @@
 import copy
-import inspect
+import importlib.util
 import os
-import sys
+import re
 import traceback
+import types
 
 from selenium.common.exceptions import *
 
+from .DomProbe import MISSING, probe_xpaths
 from .Exceptions.CommandExceptions import *
+from .FrameTracker import get_frame_tracker
+from .Lexer import COMMENT, INTEGER, STRING, lex
+from .Registry import ROOT_DIR, Signature, get_registry, get_signature, report_command_collisions
+
+# Token types whose Tokens carry the Signature of their function
+COMMAND_TOKEN_TYPES = frozenset(['ASSERTION_CMD', 'GENERAL_CMD', 'PORTAL_CMD'])
+NO_SIGNATURE = Signature((), types.MappingProxyType(dict()), None, None)
+
+# Windowed element commands keyed by module path, see get_windowed_element_commands
+_windowed_command_cache = dict()
 
 
 class CommandHandler:
@@ -29,6 +41,10 @@ class CommandHandler:
         # Consolidation of each command-classes function_args attribute
         self.function_args = dict()
 
+        # (token type, function) keyed by command name, see lookup_command
+        self.page_command_index = dict()
+        self.static_command_index = dict()
+
     def execute_command(self, user_input, session):
         """
         Error-check and run the user's input. All of the functions raise Exceptions
@@ -37,11 +53,8 @@ class CommandHandler:
         :param user_input: commands to be executed
         :param session: session for accessing both session and page-related attributes
         """
-        user_input = [word for word in user_input.split(" ")]
-        user_input = list(filter(lambda i: i, user_input))  # Remove space characters
-        if user_input:
-            parsed = self.parse_input(user_input)
-            tokens = self.tokenize_commands(parsed, session.portal.driver.test)
+        if user_input.strip(' '):
+            tokens = self.tokenize_commands(lex(user_input), session.portal.driver.test)
             valid_tokens = self.validate_tokens(tokens)
             self.run_command(valid_tokens, session)
         else:
@@ -55,26 +68,47 @@ class CommandHandler:
         searches for the single dict inside that module.
         More info here:
         https://devtopia.esri.com/andr7495/Portal-UI-Harness/wiki/Writing-XPath-for-Analysis-Tools#requirements
+        Modules are loaded from the Commands directory by file path, without
+        touching sys.path or sys.modules, and the result is cached until the
+        file is modified.
         :param path: complete dir. hierarchy to the file with the visible element-command pairs.
         """
         error_dict = dict()  # Save some memory by returning this for any error
 
         # Build path to module
-        additional_cmd_dir = os.path.join(os.sep.join(os.getcwd().split(os.sep)), 'Commands')
-        dir_path = os.path.join(additional_cmd_dir, os.sep.join(path.split('\\')[:-1]))
-        sys.path.insert(0, dir_path)
-
-        # Attempt to import the module
-        module_name = path.split('\\')[-1]
-        module_name = ''.join(module_name.split(' '))
+        path_parts = re.split(r'[\\/]', path)
+        dir_path = os.path.join(ROOT_DIR, 'Commands', *path_parts[:-1])
+        module_name = ''.join(path_parts[-1].split(' '))
         module_name = ''.join(module_name.split('-'))
+        module_path = os.path.join(dir_path, module_name + '.py')
         try:
-            exec('import {0}'.format(module_name))
-        except ModuleNotFoundError:
+            mtime = os.stat(module_path).st_mtime_ns
+        except OSError:
             m = "WARNING: Could not find the commands for the \"{0}\" module in the {1} directory." \
                 " Compare the dynamic_element dict and the folder/file names for discrepancies."
             print(m.format(module_name, dir_path))
             return error_dict
+
+        cached = _windowed_command_cache.get(module_path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        commands = CommandHandler.load_windowed_element_commands(module_name, module_path)
+        _windowed_command_cache[module_path] = (mtime, commands)
+        return commands
+
+    @staticmethod
+    def load_windowed_element_commands(module_name, module_path):
+        """
+        Imports a module of windowed element commands and returns its single dict.
+        :param module_name: (str) name of the module.
+        :param module_path: (str) full path to the module's file.
+        :return: dict of windowed element commands; empty if the module is not valid.
+        """
+        error_dict = dict()
+        spec = importlib.util.spec_from_file_location(module_name, module_path)
+        module = importlib.util.module_from_spec(spec)
+        try:
+            spec.loader.exec_module(module)
         except SyntaxError:
             m = "WARNING: A syntax error occurred while trying to import \"{0}\"." \
                 " Verify that the module's name is import-legal."
@@ -82,117 +116,157 @@ class CommandHandler:
             return error_dict
 
         # Get all non-magic attributes of the module
-        all_attributes = eval('dir({})'.format(module_name))
-        non_magic_attribute_names = list(
-            filter(
-                lambda a: not a.startswith('__') and not a.endswith('__'),
-                all_attributes
-            )
-        )
-        g = globals()
-        l = locals()
-        all_types = [eval('type({}.{})'.format(module_name, a), g, l) for a in non_magic_attribute_names]
-        num_dict = sum(list(map(lambda t: isinstance(t, dict), all_types)))
+        attributes = [
+            getattr(module, a) for a in dir(module) if not a.startswith('__') and not a.endswith('__')
+        ]
+        dicts = [a for a in attributes if isinstance(a, dict)]
 
         # Check for unexpected attributes or unexpected type
-        if num_dict > 1:
+        if len(dicts) > 1:
             print("ERROR: Multiple attributes found in {0}. Refactor to a single dictionary.\n".format(module_name))
             return error_dict
+        elif not dicts:
+            print("ERROR: Non-dict attribute returned from the {0} module.".format(module_name),
+                  "Please refactor to a dictionary.\n")
+            return error_dict
         else:
-            obj = eval('{0}.{1}'.format(module_name, non_magic_attribute_names[0]))
-            if not isinstance(obj, dict):
-                print("ERROR: Non-dict attribute returned from the {0} module.".format(module_name),
-                      "Please refactor to a dictionary.\n")
-                return error_dict
+            static_commands = get_registry().command_index
+            report_command_collisions(
+                [(cmd, static_commands[cmd][0], 'WINDOWED_ELEMENT') for cmd in dicts[0] if cmd in static_commands],
+                module_path
+            )
+            return dicts[0]
+
+    def execute_plan_line(self, plan_line, session):
+        """
+        Runs one line of a compiled ExecutionPlan, see TestCompiler. Static commands,
+        typed arguments and default arguments were resolved when the test file was
+        compiled, so only words which depend on the current page are looked up here.
+        A line whose static command is shadowed by a session argument, temporary
+        variable or page element is parsed again by execute_command instead.
+        :param plan_line: (PlanLine) compiled line of a test file.
+        :param session: session for accessing both session and page-related attributes
+        """
+        temp_vars = session.portal.driver.test
+        tokens, unrecognized_input = list(), list()
+        for token_type, name, word in plan_line.items:
+            if token_type == 'WORD':
+                token = self.tokenize_word(name, temp_vars)
+                if token is None:
+                    unrecognized_input.append(name)
+                else:
+                    tokens.append(token)
+            elif token_type in ['ASSERTION_CMD', 'GENERAL_CMD', 'PORTAL_CMD', 'ARG_CMD'] and word is not None:
+                entry = self.lookup_command(name)
+                if word in self.session_arguments or word in temp_vars or entry is None or entry[0] != token_type:
+                    return self.execute_command(plan_line.text, session)
+                tokens.append(Token(name, token_type, entry[1]))
             else:
-                return obj
+                tokens.append(Token(name, token_type))
+
+        if unrecognized_input:
+            self.report_unrecognized_input(unrecognized_input)
+        valid_tokens = self.validate_tokens(tokens)
+        self.run_command(valid_tokens, session)
 
-    def tokenize_commands(self, parsed_input, temp_vars):
+    @staticmethod
+    def generate_default_tokens(tokens):
+        """
+        Creates a Token for any default arguments NOT provided by the user.
+        Makes validation easier when multiple lines are consolidated to a single line.
+        :param tokens: list of tokenized input.
+        :return lex: returns modified list of tokenized input.
+        """
+        default_types = {
+            'int': 'INTEGER',
+            'page': 'PAGE_ELEMENT',
+            'arg': 'ARG_CMD',
+            'arb': 'ARBITRARY_CMD'
+        }
+        if len(tokens) != 1 + len(tokens[0].args) + len(tokens[0].default_args):
+            for e, token in enumerate(tokens):
+                if token.type in ['ASSERTION_CMD', 'GENERAL_CMD', 'PORTAL_CMD']:
+                    if token.default_args:
+                        for _e, (darg_name, darg_value) in enumerate(token.default_args.items()):
+                            try:
+                                if tokens[e + len(token.args) + len(token.default_args)].type != 'ARG_CMD':
+                                    tokens.insert(tokens.index(token) + len(token.args) + 1, Token(darg_value, 'ARG_CMD'))
+                            except IndexError:
+                                tokens.append(Token(darg_value, default_types[darg_name.split('_')[1]]))
+        return tokens
+
+    @staticmethod
+    def report_unrecognized_input(unrecognized_commands):
+        """
+        Prints out all unrecognized commands obtained during lexerization.
+        :param unrecognized_commands:
+        :return:
+        """
+        bad_commands = ["* {}".format(c) for c in unrecognized_commands]
+        plural = 's' if len(unrecognized_commands) > 1 else ''
+        raise UnrecognizedCommandException("Please review the command{0} for errors:\n{1}".format(plural, '\n'.join(bad_commands)))
+
+    def tokenize_commands(self, lexemes, temp_vars):
         """
         Recognizes command-types and associates input with those types.
         This is used to ensure that expected input-patterns are used.
         Inform the user of any invalid commands, and detect comments.
-        :param parsed_input: (List - Strings): user input from the commands prompt.
+        :param lexemes: (iterable - Lexeme): user input from the commands prompt, see Lexer.lex.
         :return recognized_input (list - dicts) or bool: recognized_input if
             the all input is valid, False otherwise.
         """
-        def generate_default_tokens(tokens):
-            """
-            Creates a Token for any default arguments NOT provided by the user.
-            Makes validation easier when multiple lines are consolidated to a single line.
-            :param tokens: list of tokenized input.
-            :return lex: returns modified list of tokenized input.
-            """
-            default_types = {
-                'int': 'INTEGER',
-                'page': 'PAGE_ELEMENT',
-                'arg': 'ARG_CMD',
-                'arb': 'ARBITRARY_CMD'
-            }
-            if len(tokens) != 1 + len(tokens[0].args) + len(tokens[0].default_args):
-                for e, token in enumerate(tokens):
-                    if token.type in ['ASSERTION_CMD', 'GENERAL_CMD', 'PORTAL_CMD']:
-                        if token.default_args:
-                            for _e, (darg_name, darg_value) in enumerate(token.default_args.items()):
-                                try:
-                                    if tokens[e + len(token.args) + len(token.default_args)].type != 'ARG_CMD':
-                                        tokens.insert(tokens.index(token) + len(token.args) + 1, Token(darg_value, 'ARG_CMD'))
-                                except IndexError:
-                                    tokens.append(Token(darg_value, default_types[darg_name.split('_')[1]]))
-            return tokens
-
-        def report_unrecognized_input(unrecognized_commands):
-            """
-            Prints out all unrecognized commands obtained during lexerization.
-            :param unrecognized_commands:
-            :return:
-            """
-            bad_commands = ["* {}".format(c) for c in unrecognized_commands]
-            plural = 's' if len(unrecognized_commands) > 1 else ''
-            raise UnrecognizedCommandException("Please review the command{0} for errors:\n{1}".format(plural, '\n'.join(bad_commands)))
-
-        command_functions = {
-            'ARG_CMD': {v: None for _, values in self.function_args.items() for v in values},
-            'ASSERTION_CMD': self.assertion_commands,
-            'GENERAL_CMD': self.general_commands,
-            'PAGE_ELEMENT': self.current_page_commands,
-            'PORTAL_CMD': self.portal_commands,
-            'WINDOWED_ELEMENT': self.windowed_element_commands,
-        }
-
         tokens, unrecognized_input = list(), list()
-        for cmd in parsed_input:
-            if isinstance(cmd, int):
-                tokens.append(Token(cmd, 'INTEGER'))
-            elif cmd.startswith('#'):
+        for lexeme in lexemes:
+            if lexeme.type == COMMENT:
                 break  # Ignore anything following the comment character ("#")
-            elif cmd.startswith('"') and cmd.endswith('"'):
-                tokens.append(Token(cmd[1:-1], 'ARBITRARY_CMD'))
-            elif cmd in self.session_arguments.keys():
-                tokens.append(Token(self.session_arguments[cmd], 'SESSION_ARG'))
-            elif cmd in temp_vars.keys():
-                tokens.append(Token(temp_vars[cmd], 'ARBITRARY_CMD'))
+            token = self.tokenize_lexeme(lexeme, temp_vars)
+            if token is None:
+                unrecognized_input.append(lexeme.value)
             else:
-                for command_type, commands in command_functions.items():
-                    if cmd.lower() in commands.keys():
-                        tokens.append(
-                            Token(cmd.lower(), command_type, commands[cmd.lower()])
-                        )
-                        break
-                else:
-                    unrecognized_input.append(cmd)
+                tokens.append(token)
 
         if unrecognized_input:
-            report_unrecognized_input(unrecognized_input)
+            self.report_unrecognized_input(unrecognized_input)
             return False
         elif tokens:
-            tokens = generate_default_tokens(tokens)
+            tokens = self.generate_default_tokens(tokens)
             return tokens
         elif not(tokens and unrecognized_input):
             return False
         else:
             return False  # Shouldn't ever be hit
 
+    def tokenize_lexeme(self, lexeme, temp_vars):
+        """
+        Recognizes the command-type of a single lexeme.
+        :param lexeme: (Lexeme) INTEGER, STRING or WORD from Lexer.lex.
+        :param temp_vars: (dict) temporary variables created by commands such as fill_unique.
+        :return: Token, or None if the word is not recognized.
+        """
+        if lexeme.type == INTEGER:
+            return Token(lexeme.value, 'INTEGER')
+        elif lexeme.type == STRING:
+            return Token(lexeme.value, 'ARBITRARY_CMD')
+        else:
+            return self.tokenize_word(lexeme.value, temp_vars)
+
+    def tokenize_word(self, cmd, temp_vars):
+        """
+        Recognizes the command-type of a single word.
+        :param cmd: (str) value of a WORD lexeme.
+        :param temp_vars: (dict) temporary variables created by commands such as fill_unique.
+        :return: Token, or None if the word is not recognized.
+        """
+        if cmd in self.session_arguments.keys():
+            return Token(self.session_arguments[cmd], 'SESSION_ARG')
+        elif cmd in temp_vars.keys():
+            return Token(temp_vars[cmd], 'ARBITRARY_CMD')
+        else:
+            entry = self.lookup_command(cmd.lower())
+            if entry is not None:
+                return Token(cmd.lower(), entry[0], entry[1])
+        return None
+
     def run_command(self, valid_lex, session):
         """
         Fire off functions associated with the validated commands.
@@ -216,6 +290,10 @@ class CommandHandler:
                         f.write(complete_command)
                         f.write('\n')
 
+            # Commands on page elements switch to the element's frame themselves, see FrameTracker
+            if len(command_group) < 2 or command_group[1].type not in ['PAGE_ELEMENT', 'WINDOWED_ELEMENT']:
+                get_frame_tracker(session.portal.driver).switch_to(session.portal.driver, None)
+
             if command_group[0].type == 'GENERAL_CMD':
                 token_values = get_token_values(command_group[1:])
                 cmd_map[command_group[0].type][command_group[0].name](session, *token_values)
@@ -227,6 +305,8 @@ class CommandHandler:
                     pass
                 else:
                     cmd_map[command_group[0].type][command_group[0].name](session.portal, command_group[0].argument_type, *command_group[1:])
+            elif command_group[0].type == 'ASSERTION_CMD' and getattr(session, 'assertion_group', None) is not None:
+                session.assertion_group.add(command_group, session.current_page_object)  # Run by assert_group_end
             elif command_group[0].type == 'ASSERTION_CMD':
                 cmd_map[command_group[0].type][command_group[0].name](session.portal.driver, session.current_page_object, *command_group[1:])
 
@@ -243,45 +323,50 @@ class CommandHandler:
         for window, elms in current_page_object.window_elements.items():
             for cmd, xpath in elms.items():
                 self.current_page_commands[cmd] = xpath
+        self.set_command_index()
+
+    def set_command_index(self):
+        """
+        Rebuilds the current page's overlay of the registry's read-only index of
+        static commands, see lookup_command. Words are matched in the order of
+        Registry.COMMAND_PRECEDENCE, so page elements hide portal commands but not
+        argument, assertion or general commands. Only the page's own commands are
+        copied, so a page change does not copy the static index.
+        """
+        static_index = self.static_command_index
+        index = dict()
+        for cmd, xpath in self.current_page_commands.items():
+            if static_index.get(cmd, ('PORTAL_CMD', None))[0] == 'PORTAL_CMD':
+                index[cmd] = ('PAGE_ELEMENT', xpath)
+        for cmd, xpath in self.windowed_element_commands.items():
+            if cmd not in static_index:
+                index.setdefault(cmd, ('WINDOWED_ELEMENT', xpath))
+        self.page_command_index = index
+
+    def lookup_command(self, name):
+        """
+        :param name: (str) lower-case command name.
+        :return: (tuple) token type and function of the command, from the current
+            page's overlay first, then the static index; None if it is not a command.
+        """
+        entry = self.page_command_index.get(name)
+        return self.static_command_index.get(name) if entry is None else entry
 
     def set_static_commands(self, session=None):
         """
-        Iterates through the Commands directory to import each module, and then
-        each class from each module. Each non-special function found in the
-        class is a key for it's function value in the commands dict.
-        This prepares "static" commands: those that are always available, and
-        will only need to be run once at the beginning of a session.
+        Points this handler at the static commands: those that are always available.
+        The Commands directory is only imported and inspected the first time any
+        handler in the process calls this, see Registry.get_registry.
         :param session: Automated Session object
         """
-        command_dicts = {
-            'GeneralCommands': self.general_commands,
-            'PortalCommands': self.portal_commands,
-            'MacroCommands': self.macro_commands,
-            'AssertionCommands': self.assertion_commands,
-            'ArgumentCommands': self.session_arguments
-        }
-        root_dir = '\\'.join(os.path.realpath(__file__).split('\\')[:-2])
-        cmds_dir = os.path.join(root_dir, 'Commands')
-        for root, dirs, files in os.walk(cmds_dir):
-            modules = [f[:-3] for f in files if f.endswith('py') and not f.startswith('__')]
-            break  # Limit the walk to the root dir. and no sub-folders
-
-        for module in modules:
-            exec('import Commands.{0}'.format(module))
-            classes = {
-                c[0]: c[1] for c in inspect.getmembers(
-                    eval('Commands.{0}'.format(module)), inspect.isclass
-                ) if c[0] == module
-            }
-            for class_name, class_object in classes.items():
-                functions = {
-                    f[0]: f[1] for f in inspect.getmembers(
-                        class_object, inspect.isfunction
-                    ) if not (f[0].startswith('_') or f[0].endswith('_'))
-                }
-                for func_name, func_object in functions.items():
-                    command_dicts[module].setdefault(func_name, func_object)
-            self.function_args.update(eval('Commands.{0}.{0}.function_args'.format(module)))
+        registry = get_registry()
+        self.general_commands = registry.general_commands
+        self.portal_commands = registry.portal_commands
+        self.macro_commands = registry.macro_commands
+        self.assertion_commands = registry.assertion_commands
+        self.function_args = registry.function_args
+        self.static_command_index = registry.command_index
+        self.set_command_index()
 
         if hasattr(session, 'arg_commands'):
             self.session_arguments = session.arg_commands
@@ -298,88 +383,36 @@ class CommandHandler:
         # to a page which does not have this attr. without the previous attr. carrying over.
 
         if current_page_object.dynamic_elements:
-            portal.driver.implicitly_wait(0)
+            # Every expression is checked with a single script call, see DomProbe
+            xpaths = list()
+            for xpath_expression in current_page_object.dynamic_elements.values():
+                if isinstance(xpath_expression, list):
+                    xpaths.extend(xpath_expression)
+                elif isinstance(xpath_expression, str):
+                    xpaths.append(xpath_expression)
+            try:
+                states = probe_xpaths(portal.driver, xpaths)
+            except Exception:
+                traceback.print_exc()  # DBug: not sure what to expect from this until it is thoroughly tested
+                states = dict.fromkeys(xpaths, MISSING)
+
             for directory, xpath_expression in current_page_object.dynamic_elements.items():
 
                 # Handle multiple XPath expressions
                 if isinstance(xpath_expression, list):
-                    results = list()
-                    try:
-                        for exp in xpath_expression:
-                            results.append(portal.driver.find_element_by_xpath(exp))
-                    except NoSuchElementException:
-                        pass  # We expect to hit this frequently while browsing the Viewer page.
-                    except Exception:
-                        traceback.print_exc()  # DBug: not sure what to expect from this until it is thoroughly tested
-                    else:
-                        if len(results) == len(xpath_expression):
-                            text_results = [r.text for r in results]
-                            path = os.path.join(current_page_object.__class__.__name__, directory.format(*text_results))
-                            self.windowed_element_commands.update(self.get_windowed_element_commands(path))
-                        else:
-                            print("Unexpected number of elements found.")
+                    results = [states[exp] for exp in xpath_expression]
+                    if all(r.present for r in results):  # Missing elements are expected while browsing the Viewer page
+                        text_results = [r.text for r in results]
+                        path = os.path.join(current_page_object.__class__.__name__, directory.format(*text_results))
+                        self.windowed_element_commands.update(self.get_windowed_element_commands(path))
 
                 # Handle single XPath expressions
                 elif isinstance(xpath_expression, str):
-                    try:
-                        result = portal.driver.find_element_by_xpath(xpath_expression)
-                    except NoSuchElementException:
-                        pass  # We expect to hit this frequently while browsing the Viewer page.
-                    except Exception:
-                        traceback.print_exc()  # DBug: not sure what to expect from this until it is thoroughly tested
-                    else:
+                    result = states[xpath_expression]
+                    if result.present:
                         path = os.path.join(current_page_object.id, result.text)
                         self.windowed_element_commands.update(self.get_windowed_element_commands(path))
-            portal.driver.implicitly_wait(portal.implicit_wait_amt)
-
-    @staticmethod
-    def parse_input(user_input):
-        """
-        Groups space-delimited input into separate commands.
-        After removing spaces in execute_command(), arbitrary commands need to be
-        rebuilt. This function will merge commands together into one command using
-        quotation marks.
-        Furthermore, integer-type input needs to be detected, so an attempt to
-        convert all integers from str to int is made.
-        :param user_input: (list - str) list of commands from the prompt
-        :return: (list - str) parsed string-input with merged arbitrary commands.
-        """
-        parsed_input = list()
-        substring_start = int()
-        parse_substring = False
-
-        # Gather arbitrary commands and all others
-        for e, c in enumerate(user_input):
-            if not parse_substring and c.startswith("'"):
-                raise IllegalCharacterException("Double quotes only please, no single quotes allowed.")
-            if parse_substring:
-                if '"' in c:
-                    substring = ' '.join(user_input[substring_start:e+1])
-                    parsed_input.append(substring)
-                    parse_substring = False
-                else:
-                    pass
-            elif '"' in c:
-                if c.count('"') % 2 == 0:
-                    parsed_input.append(c)
-                else:
-                    parse_substring = True
-                    substring_start = e
-            else:
-                parsed_input.append(c)
-
-        # Convert all integer-str's to int and replace in output
-        for e, token in enumerate(parsed_input):
-            try:
-                int_token = int(token)
-            except ValueError:
-                pass
-            else:
-                parsed_input[e] = int_token
-
-        if parse_substring:
-            raise InvalidPattern("Could not find matching double-quote for arbitrary command.")
-        return parsed_input
+        self.set_command_index()
 
     @staticmethod
     def validate_tokens(tokens_org):
@@ -410,7 +443,8 @@ class CommandHandler:
                 'WINDOWED_ELEMENT': 'page',
                 'GENERAL_CMD': None,
                 'PORTAL_CMD': None,
-                'ASSERTION_CMD': None
+                'ASSERTION_CMD': None,
+                'WORD': None
             }
             if not function.args and not function.kwargs:
                 return True
@@ -423,7 +457,7 @@ class CommandHandler:
                 if not args_matchup:
                     raise MissingExpectedArgument('could not find expected argument for "{}"'.format(function.name))
                 for expected, actual in args_matchup.items():
-                    if expected == type_matches[actual]:
+                    if actual == 'WORD' or expected == type_matches[actual]:  # WORDs are checked once resolved
                         pass
                     else:
                         mismatch[expected] = actual
@@ -432,7 +466,7 @@ class CommandHandler:
                 expected_kwarg_pattern = [name.split('_')[1] for name in function.default_args]
                 kwargs_matchup = {z[0]: z[1].type for z in list(zip(expected_kwarg_pattern, kwargs))}
                 for expected, actual in kwargs_matchup.items():
-                    if expected == type_matches[actual]:
+                    if actual == 'WORD' or expected == type_matches[actual]:
                         pass
                     else:
                         mismatch[expected] = actual
@@ -471,22 +505,23 @@ class CommandHandler:
 
 
 class Token:
+    """
+    Class used to "tokenize" a command during parsing.
+    This enables command validation later on.
+    Tokens are built for every word of every line, so they are slotted, and
+    command tokens share the Signature the registry built for their function
+    instead of copying it.
+    """
+    __slots__ = ('func', 'name', 'signature', 'type')
+
     def __init__(self, name, token_type, func=None):
-        """
-        Class used to "tokenize" a command during parsing.
-        This enables command validation later on.
-        """
-        self.args = list()
-        self.default_args = dict()
         self.func = func
-        self.kwargs = list()
         self.name = name
         self.type = token_type
-        self.unpack_args = None
-        self.unpack_kwargs = None
-
-        if token_type in ['ASSERTION_CMD', 'GENERAL_CMD', 'PORTAL_CMD']:
-            self.set_arg_attributes()
+        if token_type in COMMAND_TOKEN_TYPES:
+            self.signature = get_registry().signatures.get(func) or get_signature(func)
+        else:
+            self.signature = NO_SIGNATURE
 
     def __repr__(self):
         """
@@ -495,19 +530,22 @@ class Token:
         """
         return '{0}: {1}'.format(self.type, self.name)
 
-    def set_arg_attributes(self):
-        """
-        Sets argument-related attributes of a Token object.
-        Note that the inspect module has no way to build an association between
-        default arguments and their values, so we have to improvise a bit by
-        assuming the reversed "args" and "defaults" properties can be zipped.
-        """
-        arg_spec = inspect.getfullargspec(self.func)
+    @property
+    def args(self):
+        return self.signature.args
+
+    @property
+    def default_args(self):
+        return self.signature.default_args
+
+    @property
+    def kwargs(self):
+        return ()
 
-        self.args = [a for a in arg_spec.args if not a.startswith('default') and not a.startswith('_')]
-        self.unpack_args = arg_spec.varargs
-        self.unpack_kwargs = arg_spec.varkw
+    @property
+    def unpack_args(self):
+        return self.signature.unpack_args
 
-        if arg_spec.defaults:
-            zipped = zip(reversed(arg_spec.args), reversed(arg_spec.defaults))
-            self.default_args = {e[0]: e[1] for e in list(zipped)}
+    @property
+    def unpack_kwargs(self):
+        return self.signature.unpack_kwargs
@@ -1,9 +1,12 @@
+import collections
 import json
 import os
 
 from datetime import datetime
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import SQLAlchemyError
 
 app = Flask(__name__)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False  # Default value to suppress error messaging
@@ -18,7 +21,7 @@ class TestSession(db.Model):
     __tablename__ = 'testsession'
     id              = db.Column(db.Integer, primary_key=True, nullable=False)
     assertion_level = db.Column(db.String, nullable=False)
-    start_time      = db.Column(db.String)
+    start_time      = db.Column(db.String, index=True)
     end_time        = db.Column(db.String)
     total_time      = db.Column(db.Float)
     endpoint        = db.Column(db.String, nullable=False)
@@ -39,66 +42,350 @@ class Tests(db.Model):
     """
     __tablename__ = 'tests'
     id           = db.Column(db.Integer, primary_key=True)
-    session_id   = db.Column(db.Integer, db.ForeignKey('testsession.id'))
+    session_id   = db.Column(db.Integer, db.ForeignKey('testsession.id'), index=True)
     tool_name    = db.Column(db.String)
     test_name    = db.Column(db.String)
-    test_passed  = db.Column(db.Boolean)
+    test_passed  = db.Column(db.Boolean, index=True)
     test_details = db.Column(db.String)
+    duration     = db.Column(db.Float)  # Seconds the test file took; None for results written before schema 3
     rel_session  = db.relationship('TestSession', backref=db.backref('tests_backref'))
 
-    def __init__(self, tool_name, test_name, test_passed, test_details):
+    def __init__(self, tool_name, test_name, test_passed, test_details, duration=None):
         self.tool_name    = tool_name
         self.test_name    = test_name
         self.test_passed  = test_passed
         self.test_details = test_details
+        self.duration     = duration
+
+
+class SessionSummary(db.Model):
+    """
+    Table of each session's test counts, kept up to date as results are written,
+    so reports never have to scan the tests table.
+    duration is the total of the tests which have one; timed is how many do.
+    """
+    __tablename__ = 'session_summary'
+    session_id      = db.Column(db.Integer, db.ForeignKey('testsession.id'), primary_key=True)
+    start_time      = db.Column(db.String, index=True)
+    endpoint        = db.Column(db.String)
+    assertion_level = db.Column(db.String)
+    tests           = db.Column(db.Integer, nullable=False, default=0)
+    passed          = db.Column(db.Integer, nullable=False, default=0)
+    duration        = db.Column(db.Float, nullable=False, default=0)
+    timed           = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ToolSummary(db.Model):
+    """
+    Table of each tool's test counts per session, kept up to date like SessionSummary.
+    """
+    __tablename__ = 'tool_summary'
+    session_id      = db.Column(db.Integer, db.ForeignKey('testsession.id'), primary_key=True)
+    tool_name       = db.Column(db.String, primary_key=True)
+    start_time      = db.Column(db.String, index=True)
+    endpoint        = db.Column(db.String)
+    assertion_level = db.Column(db.String)
+    tests           = db.Column(db.Integer, nullable=False, default=0)
+    passed          = db.Column(db.Integer, nullable=False, default=0)
+    duration        = db.Column(db.Float, nullable=False, default=0)
+    timed           = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__  = (db.Index('ix_tool_summary_tool_name_start_time', 'tool_name', 'start_time'),)
+
+
+# Fills the summary tables from the tests table, for sessions written before schema 3
+BACKFILL_SUMMARIES = [
+    """
+    INSERT INTO session_summary (session_id, start_time, endpoint, assertion_level, tests, passed, duration, timed)
+    SELECT s.id, s.start_time, s.endpoint, s.assertion_level,
+           COUNT(t.id), COALESCE(SUM(t.test_passed), 0), COALESCE(SUM(t.duration), 0), COUNT(t.duration)
+    FROM testsession s LEFT JOIN tests t ON t.session_id = s.id
+    WHERE s.id NOT IN (SELECT session_id FROM session_summary)
+    GROUP BY s.id
+    """,
+    """
+    INSERT INTO tool_summary (session_id, tool_name, start_time, endpoint, assertion_level, tests, passed, duration, timed)
+    SELECT s.id, t.tool_name, s.start_time, s.endpoint, s.assertion_level,
+           COUNT(t.id), COALESCE(SUM(t.test_passed), 0), COALESCE(SUM(t.duration), 0), COUNT(t.duration)
+    FROM testsession s JOIN tests t ON t.session_id = s.id
+    WHERE s.id NOT IN (SELECT DISTINCT session_id FROM tool_summary)
+    GROUP BY s.id, t.tool_name
+    """,
+]
 
 
 class Database:
     """
-    Handles data prep and updates for the database.
+    Writes test results to the database as each test file finishes. The session
+    row is created when the session starts and finalized when it ends, so a
+    session which crashes keeps the results of every file it finished, and the
+    WebApp can show a session while it is still running.
+
+    Each result is committed as soon as it is recorded. Results arrive once per
+    test file, seconds apart, and in WAL mode with synchronous=NORMAL a commit
+    does not sync the disk, so holding results back to batch them would only
+    delay the WebApp's live view. A commit which fails, such as when another
+    connection holds a lock for longer than BUSY_TIMEOUT, is logged and does not
+    stop the run: its results stay pending and are retried by the next commit.
+    Pending results are written with a single executemany insert through
+    SQLAlchemy Core; the models above only define the schema.
+
+    Each commit also updates the SessionSummary and ToolSummary tables, so the
+    WebApp's trend reports only read those.
+
+    The schema's version is kept in SQLite's user_version, so tables are only
+    created when a database is new or older than SCHEMA_VERSION.
     """
-    def __init__(self, ts, dp):
+    SCHEMA_VERSION = 3  # Increase when the models change, and upgrade older databases in create_schema
+    BUSY_TIMEOUT = 5  # Seconds a write waits for a lock held by another connection
+
+    def __init__(self, dp):
         """
-        Creates/updates a database with new session data.
-        :param ts: automated test session object
+        Creates the database's tables if they do not exist yet.
         :param dp: database path from main.py
         """
         self.database_path = dp
-        self.test_session = ts
+        self.engine = None
+        self.session_id = None  # id of the testsession row being written
+        self.session_info = None  # start_time, endpoint and assertion_level of that session
+        self.pending = list()  # tests rows, as dicts, which have not been committed yet
+        self.session_end = None  # end_time and total_time of the session, until they are committed
 
         if not os.path.exists(os.sep.join(self.database_path.split(os.sep)[:-1])):
             print("Cannot find database path, skipping update: {}".format(self.database_path))
         else:
-            app.config['SQLALCHEMY_DATABASE_URI'] = r'sqlite:///' + self.database_path
-            db.create_all()
-
-            # Update the session table
-            session_tuple = (
-                self.test_session.current_assertion_level,
-                datetime.fromtimestamp(self.test_session.start_time_ms).replace(microsecond=0),
-                datetime.fromtimestamp(self.test_session.end_time_ms).replace(microsecond=0),
-                round((self.test_session.end_time_ms - self.test_session.start_time_ms) / 60, 2),
-                self.test_session.endpoint,
-                self.test_session.arg_commands['arg_0']
-            )
-            session_data = TestSession(*session_tuple)
-            db.session.add(session_data)
-
-            # Update the tests table
-            for assert_lvl, dict1 in self.test_session.test_results.items():
-                for brwsr, dict2 in dict1.items():
-                    for tool_cat, tools in dict2.items():
-                        for tool, test_dict in tools.items():
-                            for file_name, result in test_dict.items():
-                                test_tuple = (
-                                    ' - '.join([tool_cat, tool]),
-                                    file_name,
-                                    True if result == 'PASS' else False,
-                                    result
-                                )
-                                test_data = Tests(*test_tuple)
-                                test_data.rel_session = session_data
-                                db.session.add(test_data)
-
-            db.session.commit()
-            print("Database {} successfully updated!\n".format(self.database_path))
+            self.engine = create_engine(r'sqlite:///' + self.database_path, connect_args={'timeout': self.BUSY_TIMEOUT})
+            event.listen(self.engine, 'connect', self.set_pragmas)
+            if not self.create_schema(self.engine):
+                self.engine.dispose()
+                self.engine = None
+
+    @staticmethod
+    def set_pragmas(connection, _):
+        """
+        WAL mode lets the WebApp read while results are written. In WAL mode,
+        synchronous=NORMAL still survives a crash of this process, without
+        syncing the disk on every commit.
+        """
+        cursor = connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
+    @classmethod
+    def create_schema(cls, engine):
+        """
+        Creates the tables unless the database's user_version shows they are up to date.
+        Databases written before the version was recorded have a user_version of 0.
+        :param engine: SQLAlchemy engine of the database.
+        :return: (bool) False if the database was written by a newer schema.
+        """
+        with engine.begin() as connection:
+            version = connection.execute(text('PRAGMA user_version')).scalar()
+            if version > cls.SCHEMA_VERSION:
+                print("Database schema version {0} is newer than {1}, skipping update.".format(
+                    version, cls.SCHEMA_VERSION
+                ))
+                return False
+            elif version < cls.SCHEMA_VERSION:
+                db.Model.metadata.create_all(connection)
+                cls.upgrade_schema(connection, version)
+                connection.execute(text('PRAGMA user_version = {0:d}'.format(cls.SCHEMA_VERSION)))
+        return True
+
+    @staticmethod
+    def upgrade_schema(connection, version):
+        """
+        Adds what later schema versions added to tables which already existed,
+        since create_all only creates missing tables.
+        :param connection: SQLAlchemy connection, inside a transaction.
+        :param version: (int) the database's user_version before the upgrade.
+        """
+        # Version 2: indexes
+        existing = set(row[0] for row in connection.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'index'")
+        ))
+        for table in db.Model.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(connection)
+
+        # Version 3: test durations
+        columns = [row[1] for row in connection.execute(text('PRAGMA table_info(tests)'))]
+        if 'duration' not in columns:
+            connection.execute(text('ALTER TABLE tests ADD COLUMN duration FLOAT'))
+
+        # Version 3: summary tables, which need the durations
+        if version < 3:
+            for statement in BACKFILL_SUMMARIES:
+                connection.execute(text(statement))
+
+    @property
+    def enabled(self):
+        return self.engine is not None
+
+    def start_session(self, assertion_level, start_time, endpoint, username):
+        """
+        Creates the session row. Its end_time stays empty until finish_session.
+        :param assertion_level: (str) assertion level of the session.
+        :param start_time: (float) start of the session, from time.time().
+        :param endpoint: (str) URL being tested.
+        :param username: (str) user the tests sign in as, or None.
+        """
+        if not self.enabled:
+            return
+        self.retry_session()
+        session_info = {
+            'start_time': datetime.fromtimestamp(start_time).replace(microsecond=0),
+            'endpoint': endpoint,
+            'assertion_level': assertion_level
+        }
+        try:
+            with self.engine.begin() as connection:
+                result = connection.execute(TestSession.__table__.insert().values(username=username, **session_info))
+                session_id = result.inserted_primary_key[0]
+                connection.execute(SessionSummary.__table__.insert().values(session_id=session_id, **session_info))
+        except SQLAlchemyError as err:
+            print("WARNING: Could not start the database session, its results will not be written: {0}".format(err))
+            return
+        self.session_id = session_id
+        self.session_info = session_info
+        self.session_end = None
+
+    def record_result(self, tool_category, tool, file_name, result, duration=None):
+        """
+        Adds the result of one test file and commits it, so each result is in the
+        database as soon as its file finishes.
+        :param tool_category: (str) analysis category of the tool.
+        :param tool: (str) name of the tool.
+        :param file_name: (str) name of the test file.
+        :param result: (str) "PASS", or the failure message.
+        :param duration: (float) seconds the test file took, if known.
+        """
+        if self.session_id is None:
+            return
+        self.pending.append({
+            'session_id': self.session_id,
+            'tool_name': ' - '.join([tool_category, tool]),
+            'test_name': file_name,
+            'test_passed': result == 'PASS',
+            'test_details': result,
+            'duration': duration
+        })
+        self.flush()
+
+    def flush(self):
+        """
+        Commits every result added since the last commit, with one executemany
+        insert, and adds them to the summary tables in the same transaction.
+        If the commit fails the results stay pending, so the next flush retries them.
+        :return: (bool) True if no results are left pending.
+        """
+        if self.pending:
+            try:
+                with self.engine.begin() as connection:
+                    connection.execute(Tests.__table__.insert(), self.pending)
+                    self.update_summaries(connection, self.pending)
+            except SQLAlchemyError as err:
+                print("WARNING: Could not write {0} result(s) to the database, retrying later: {1}".format(
+                    len(self.pending), err
+                ))
+                return False
+            self.pending = list()
+        return True
+
+    def update_summaries(self, connection, rows):
+        """
+        Adds a batch of tests rows to the current session's SessionSummary and ToolSummary rows.
+        :param connection: SQLAlchemy connection, inside the batch's transaction.
+        :param rows: (list - dict) tests rows of the current session.
+        """
+        counts = collections.OrderedDict()  # [tests, passed, duration, timed] keyed by tool name
+        for row in rows:
+            tool_counts = counts.setdefault(row['tool_name'], [0, 0, 0.0, 0])
+            tool_counts[0] += 1
+            tool_counts[1] += row['test_passed']
+            if row['duration'] is not None:
+                tool_counts[2] += row['duration']
+                tool_counts[3] += 1
+
+        def add_counts(table, where, tests, passed, duration, timed):
+            return connection.execute(table.update().where(where).values(
+                tests=table.c.tests + tests,
+                passed=table.c.passed + passed,
+                duration=table.c.duration + duration,
+                timed=table.c.timed + timed
+            )).rowcount
+
+        table = SessionSummary.__table__
+        add_counts(table, table.c.session_id == self.session_id, *[sum(c[i] for c in counts.values()) for i in range(4)])
+
+        table = ToolSummary.__table__
+        for tool_name, tool_counts in counts.items():
+            where = (table.c.session_id == self.session_id) & (table.c.tool_name == tool_name)
+            if not add_counts(table, where, *tool_counts):
+                tests, passed, duration, timed = tool_counts
+                connection.execute(table.insert().values(
+                    session_id=self.session_id, tool_name=tool_name, tests=tests, passed=passed,
+                    duration=duration, timed=timed, **self.session_info
+                ))
+
+    def finish_session(self, start_time, end_time):
+        """
+        Commits any remaining results and records when the session ended. If
+        either commit fails, the session stays open and close retries them.
+        :param start_time: (float) start of the session, from time.time().
+        :param end_time: (float) end of the session, from time.time().
+        """
+        if self.session_id is None:
+            return
+        self.session_end = {
+            'end_time': datetime.fromtimestamp(end_time).replace(microsecond=0),
+            'total_time': round((end_time - start_time) / 60, 2)
+        }
+        self.end_session()
+
+    def end_session(self):
+        """
+        Commits the pending results and the session's end, then closes the session.
+        :return: (bool) False if a commit failed, leaving the session open.
+        """
+        if not self.flush():
+            return False
+        table = TestSession.__table__
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(table.update().where(table.c.id == self.session_id).values(**self.session_end))
+        except SQLAlchemyError as err:
+            print("WARNING: Could not record the end of the database session, retrying later: {0}".format(err))
+            return False
+        self.session_id = None
+        self.session_info = None
+        self.session_end = None
+        print("Database {} successfully updated!\n".format(self.database_path))
+        return True
+
+    def retry_session(self):
+        """
+        Retries whatever failed commits left pending for the current session, for
+        the last time. Results which still cannot be written are reported as lost.
+        """
+        if self.session_id is None:
+            return
+        if self.session_end is not None:
+            written = self.end_session()
+        else:
+            written = self.flush()
+        if not written:
+            print("WARNING: {0} result(s) were not written to {1}".format(len(self.pending), self.database_path))
+            self.pending = list()
+            self.session_id = None
+            self.session_info = None
+            self.session_end = None
+
+    def close(self):
+        """
+        Retries whatever a failed commit left pending, and closes the database's connections.
+        """
+        if self.enabled:
+            self.retry_session()
+            self.engine.dispose()
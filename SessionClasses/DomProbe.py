@@ -0,0 +1,119 @@
+"""
+Reads the state of many elements with a single web driver call.
+
+Checking an element through Selenium costs one HTTP round trip to find it and
+one more for every property read from it. probe_xpaths evaluates a list of
+XPath expressions in the browser instead, and returns the presence, visibility,
+enabled state and text of each first match from one execute_script call.
+
+Probes never wait: an element which is missing is reported as missing, whatever
+the driver's implicit wait is. Use WaitCommands.poll_until to wait on a probe.
+Probes run in the driver's current frame, like find_element_by_xpath.
+
+Inside a batched_probes block, expressions which were probed up front are read
+from those results instead of the page, see AssertionGroup.
+"""
+
+import collections
+import contextlib
+
+from ControlObjects.ControlBase import DIJIT_PARENT_JS, IS_DISPLAYED_JS
+from .FrameTracker import get_frame_tracker
+
+# class_name is the element's class attribute; value is None for elements without one
+ElementState = collections.namedtuple(
+    'ElementState', ['present', 'visible', 'enabled', 'text', 'value', 'class_name']
+)
+MISSING = ElementState(False, False, False, '', None, '')
+
+# Returns a list aligned with arguments[0]: null for missing elements or invalid
+# expressions, otherwise [visible, enabled, text, value, class]. Visibility is judged by
+# the atom WebElement.is_displayed runs, on the same element as the control objects do:
+# the dijit parent for Buttons and TimeTextBoxes, otherwise the element itself.
+PROBE_SCRIPT = """
+var isDisplayed = (%s);
+var dijitParent = (%s);
+var results = [];
+for (var i = 0; i < arguments[0].length; i++) {
+    var state = null;
+    try {
+        var el = document.evaluate(
+            arguments[0][i], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+        ).singleNodeValue;
+        if (el && el.nodeType === 1) {
+            var displayed = isDisplayed(el), visible = displayed;
+            var parent = dijitParent(el);
+            if (parent && parent !== el) {
+                var tokens = (parent.getAttribute('class') || '').split(' ');
+                if (tokens.indexOf('dijitButton') >= 0 || tokens.indexOf('dijitTimeTextBox') >= 0) {
+                    visible = isDisplayed(parent);
+                }
+            }
+            var text = displayed ? (el.innerText || el.textContent || '') : '';
+            state = [
+                visible,
+                !el.disabled,
+                text.replace(/^\\s+|\\s+$/g, ''),
+                el.value === undefined ? null : String(el.value),
+                el.getAttribute('class') || ''
+            ];
+        }
+    } catch (e) {}
+    results.push(state);
+}
+return results;
+""" % (IS_DISPLAYED_JS, DIJIT_PARENT_JS)
+
+
+def probe_xpaths(driver, xpaths):
+    """
+    Reads the state of the first element matched by each XPath expression.
+    :param driver: Web driver object.
+    :param xpaths: iterable of XPath expressions; duplicates are only evaluated once.
+    :return: dict of ElementState keyed by XPath expression; MISSING for expressions
+        which match nothing or are not valid.
+    """
+    xpaths = list(collections.OrderedDict.fromkeys(xpaths))
+    batch = getattr(driver, 'probe_batch', None)
+    states = dict()
+    if batch:
+        probed = batch.get(get_frame_tracker(driver).current, dict())
+        states = {xpath: probed[xpath] for xpath in xpaths if xpath in probed}
+        xpaths = [xpath for xpath in xpaths if xpath not in probed]
+    if not xpaths:
+        return states
+    results = driver.execute_script(PROBE_SCRIPT, xpaths) or list()
+    for xpath, result in zip(xpaths, results):
+        states[xpath] = MISSING if result is None else ElementState(True, *result)
+    return states
+
+
+def probe_xpath(driver, xpath):
+    """
+    :param driver: Web driver object.
+    :param xpath: XPath expression.
+    :return: ElementState of the first element matched by the expression.
+    """
+    return probe_xpaths(driver, [xpath])[xpath]
+
+
+@contextlib.contextmanager
+def batched_probes(driver, xpaths_by_frame):
+    """
+    Probes every expression with one script call per frame, and serves probe_xpaths
+    calls from those results until the block ends. The results are only as fresh
+    as the start of the block.
+    :param driver: Web driver object.
+    :param xpaths_by_frame: (dict) iterables of XPath expressions keyed by frame name,
+        None for the default content.
+    """
+    tracker = get_frame_tracker(driver)
+    batch = dict()
+    for frame, xpaths in xpaths_by_frame.items():
+        tracker.switch_to(driver, frame)
+        batch[frame] = probe_xpaths(driver, xpaths)
+    driver.probe_batch = batch
+    try:
+        yield batch
+    finally:
+        driver.probe_batch = None
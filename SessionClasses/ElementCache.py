@@ -0,0 +1,90 @@
+"""
+Reuses WebElement handles instead of finding the same element again.
+
+A line often finds the same element several times: once to check that it is
+enabled, once to run the command and again for every poll of an assertion.
+Each driver gets an ElementCache, keyed by the frame the driver is switched to
+(see FrameTracker) and the XPath expression. The cache is cleared whenever
+PageTracker sees the page change, and a handle which has gone stale within a
+page is found again and the action retried, see perform.
+"""
+
+from selenium.common.exceptions import StaleElementReferenceException
+
+from .FrameTracker import get_frame_tracker
+from .WaitCommands import find_element
+
+
+class ElementCache:
+    """
+    WebElements keyed by (frame, XPath expression), with hit and miss counts.
+    """
+    def __init__(self):
+        self.elements = dict()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def clear(self):
+        """
+        Forgets every element. Call this when the page changes.
+        """
+        self.elements = dict()
+
+    def find(self, driver, xpath):
+        """
+        :param driver: Web driver object.
+        :param xpath: XPath expression of the element.
+        :return: cached WebElement, or the element found by WaitCommands.find_element.
+        """
+        key = (get_frame_tracker(driver).current, xpath)
+        element = self.elements.get(key)
+        if element is None:
+            self.misses += 1
+            element = self.elements[key] = find_element(driver, xpath)
+        else:
+            self.hits += 1
+        return element
+
+    def perform(self, driver, xpath, action):
+        """
+        Calls action with the element. If the cached element has gone stale, the
+        element is found again and action is called once more.
+        :param driver: Web driver object.
+        :param xpath: XPath expression of the element.
+        :param action: function which accepts a WebElement.
+        :return: the value returned by action.
+        """
+        try:
+            return action(self.find(driver, xpath))
+        except StaleElementReferenceException:
+            self.stale += 1
+            self.elements.pop((get_frame_tracker(driver).current, xpath), None)
+            return action(self.find(driver, xpath))
+
+    def get_summary(self):
+        """
+        :return: (str) hit, miss and stale counts since the last reset_stats.
+        """
+        return "{0} hits, {1} misses, {2} stale".format(self.hits, self.misses, self.stale)
+
+    def reset_stats(self):
+        self.hits = self.misses = self.stale = 0
+
+
+def get_element_cache(driver):
+    """
+    :param driver: Web driver object.
+    :return: the driver's ElementCache; drivers not created by a Portal are given one.
+    """
+    cache = getattr(driver, 'element_cache', None)
+    if cache is None:
+        cache = driver.element_cache = ElementCache()
+    return cache
+
+
+def perform(driver, xpath, action):
+    """
+    Calls action with the element found by xpath, see ElementCache.perform.
+    """
+    return get_element_cache(driver).perform(driver, xpath, action)
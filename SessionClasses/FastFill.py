@@ -0,0 +1,85 @@
+"""
+Enters text into a text box by setting its value with a script instead of
+sending one keystroke at a time.
+
+send_keys types each character in turn, which takes seconds for the long
+strings, JSON snippets and expressions some tests paste in. Fast fill appends
+the text to the element's value in a single script call. It then dispatches
+the keydown, input, keyup and change events which dijit widgets listen to, so
+their values and validation update as if the text had been typed.
+
+Only visible, editable text inputs and text areas are filled this way. Text
+containing newlines or special keys, and elements which reject the value (such
+as a number input given letters), fall back to send_keys.
+
+Fast fill is used by the fill_fast command, and by fill and fill_unique when
+the driver's fast_fill setting is on, see Portal.
+"""
+
+FAST_FILL = False  # Default for drivers not created by a Portal
+
+# Input types whose value is free text; other inputs are left to send_keys
+TEXT_INPUT_TYPES = ['', 'text', 'search', 'url', 'tel', 'email', 'password', 'number']
+
+# arguments: the element, the text, TEXT_INPUT_TYPES. Returns true if the value was set.
+FILL_SCRIPT = """
+var element = arguments[0], text = arguments[1], textTypes = arguments[2];
+var tag = element.tagName.toLowerCase(), proto;
+if (tag === 'textarea') {
+    proto = HTMLTextAreaElement.prototype;
+} else if (tag === 'input' && textTypes.indexOf((element.getAttribute('type') || '').toLowerCase()) >= 0) {
+    proto = HTMLInputElement.prototype;
+} else {
+    return false;
+}
+if (element.disabled || element.readOnly || !element.getClientRects().length) {
+    return false;
+}
+var setValue = Object.getOwnPropertyDescriptor(proto, 'value').set;
+var before = element.value, after = before + text;
+element.focus();
+setValue.call(element, after);
+if (element.value !== after) {
+    setValue.call(element, before);
+    return false;
+}
+var key = text.charAt(text.length - 1);
+element.dispatchEvent(new KeyboardEvent('keydown', {key: key, bubbles: true, cancelable: true}));
+element.dispatchEvent(new Event('input', {bubbles: true}));
+element.dispatchEvent(new KeyboardEvent('keyup', {key: key, bubbles: true, cancelable: true}));
+element.dispatchEvent(new Event('change', {bubbles: true}));
+return true;
+"""
+
+
+def can_fill_fast(text):
+    """
+    :param text: (str) text to enter.
+    :return: (bool) False if the text has newlines or special keys, such as
+        Keys.RETURN, which only send_keys can enter.
+    """
+    return not any(c in '\r\n' or '\ue000' <= c <= '\uf8ff' for c in text)
+
+
+def fill_element(element, text, fast):
+    """
+    Enters text into an element, with a script if fast is True and the element
+    accepts it, or with send_keys otherwise.
+    :param element: WebElement of the text box.
+    :param text: (str) text to append to the element's value.
+    :param fast: (bool) True to try fast fill first.
+    :return: (bool) True if fast fill entered the text.
+    """
+    if fast and text and can_fill_fast(text):
+        if element.parent.execute_script(FILL_SCRIPT, element, text, TEXT_INPUT_TYPES):
+            return True
+    element.send_keys(text)
+    return False
+
+
+def use_fast_fill(driver):
+    """
+    :param driver: Web driver object.
+    :return: (bool) the driver's fast_fill setting.
+    """
+    return getattr(driver, 'fast_fill', FAST_FILL)
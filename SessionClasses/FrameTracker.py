@@ -0,0 +1,95 @@
+"""
+Keeps track of the frame each driver is switched to, so commands only switch
+frames when they need a different one.
+
+The __switch_frame decorators look an element's frame up in the page object's
+frame_index and ask the driver's FrameTracker to switch to it. The driver is
+left in that frame afterwards, so a run of commands inside one frame switches
+in once, and the first command outside it switches back. PageTracker resets
+the tracker to the default content whenever the page changes.
+"""
+
+
+class FrameTracker:
+    """
+    Switches a driver between frames, skipping switches to the current frame.
+    """
+    def __init__(self):
+        self.current = None  # Name of the current frame; None for the default content
+        self.switches = 0
+        self.skipped = 0
+
+    def switch_to(self, driver, frame):
+        """
+        :param driver: Web driver object.
+        :param frame: (str) name of the frame to switch to; None for the default content.
+        """
+        if frame == self.current:
+            self.skipped += 1
+            return
+        if self.current is not None:
+            driver.switch_to_default_content()  # Frame names are looked up from the current frame
+            self.current = None
+            self.switches += 1
+        if frame is not None:
+            driver.switch_to_frame(frame)
+            self.current = frame
+            self.switches += 1
+
+    def reset(self, driver):
+        """
+        Switches to the default content whatever the current frame is thought to
+        be. Call this when the page has changed, since navigating also leaves
+        the frame.
+        :param driver: Web driver object.
+        """
+        driver.switch_to_default_content()
+        self.current = None
+
+    def get_summary(self):
+        """
+        :return: (str) switch counts since the last reset_stats.
+        """
+        return "{0} run, {1} skipped".format(self.switches, self.skipped)
+
+    def reset_stats(self):
+        self.switches = self.skipped = 0
+
+
+def get_frame_tracker(driver):
+    """
+    :param driver: Web driver object.
+    :return: the driver's FrameTracker; drivers not created by a Portal are given one.
+    """
+    tracker = getattr(driver, 'frame_tracker', None)
+    if tracker is None:
+        tracker = driver.frame_tracker = FrameTracker()
+    return tracker
+
+
+def get_frame_index(page_object):
+    """
+    Maps each of a page object's frame elements to its frame. Built the first
+    time it is needed and kept on the page object as frame_index.
+    :param page_object: page object instance.
+    :return: (dict) frame names keyed by lowercase element name.
+    """
+    index = getattr(page_object, 'frame_index', None)
+    if index is None:
+        index = dict()
+        for frame, elements in (page_object.frame_elements or dict()).items():
+            for element in elements:
+                index.setdefault(element.lower(), frame)  # The first frame listing an element wins
+        page_object.frame_index = index
+    return index
+
+
+def switch_to_element_frame(driver, page_object, element):
+    """
+    Switches the driver to the frame containing an element, or to the default
+    content if the element is not in a frame.
+    :param driver: Web driver object.
+    :param page_object: current page object.
+    :param element: (str) name of the page element.
+    """
+    get_frame_tracker(driver).switch_to(driver, get_frame_index(page_object).get(element.lower()))
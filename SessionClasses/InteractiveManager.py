@@ -10,6 +10,7 @@ import sys
 from SessionClasses.PortalHandler import Portal
 from SessionClasses.PageHandler import PageHandler
 from .CommandHandler import CommandHandler
+from .PageTracker import PageTracker
 
 
 class InteractiveSession:
@@ -23,7 +24,9 @@ class InteractiveSession:
         """
         print("Starting Interactive Mode...")
         os.chdir(os.sep.join(os.path.dirname(os.path.realpath(__file__)).split(os.sep)[:-1]))
+        self.assertion_group = None
         self.current_page_object = None
+        self.page_tracker = PageTracker()
         self.prompt = '> '
         self.save_enabled = False
         self.try_mode = False
@@ -44,10 +47,7 @@ class InteractiveSession:
 
         print("Navigating to page {0}...".format(self.portal.endpoint))
         self.portal.navigate_to_page(self.portal.endpoint)
-        self.current_page_object = self.pages.get_current_page(self.portal)
-        self.commands.set_current_page_commands(self.current_page_object)
-        self.commands.set_visible_element_commands(self.portal, self.current_page_object)
-        self.pages.verify_page_has_loaded(self.current_page_object, self.portal)
+        self.page_tracker.update(self)
 
         print("\nInteractive Session {}\n".format(self.ready_messages[randint(0, len(self.ready_messages)-1)]))
         self.start_input_loop()
@@ -82,10 +82,7 @@ class InteractiveSession:
         self.portal.driver.test = dict()
         while True:
             user_input = input(self.prompt)
-            self.current_page_object = self.pages.get_current_page(self.portal)
-            self.commands.set_current_page_commands(self.current_page_object)
-            self.commands.set_visible_element_commands(self.portal, self.current_page_object)
-            self.pages.verify_page_has_loaded(self.current_page_object, self.portal)
+            self.page_tracker.update(self)
             try:
                 self.commands.execute_command(user_input, self)
             except:  # Accepts any Exception to prevent crashes and log useful info
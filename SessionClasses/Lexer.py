@@ -0,0 +1,83 @@
+"""
+Splits a line of input into typed lexemes in a single pass. Used by the
+interactive session, the automated session and TestCompiler alike.
+
+Words are separated by spaces. A word containing an odd number of double
+quotes starts a string, which ends with the next word containing a double
+quote; the words of a string are joined by single spaces. Strings must start
+and end with a double quote to be ARBITRARY_CMDs, see CommandHandler.tokenize_lexeme.
+A word starting with "#" starts a comment which runs to the end of the line.
+
+Columns are counted from 1, so errors can point at the offending character.
+"""
+
+import collections
+
+from .Exceptions.CommandExceptions import IllegalCharacterException, InvalidPattern
+
+COMMENT = 'COMMENT'
+INTEGER = 'INTEGER'
+STRING = 'STRING'
+WORD = 'WORD'
+
+# value: int for INTEGERs, the text between the quotes for STRINGs, the text otherwise
+Lexeme = collections.namedtuple('Lexeme', ['type', 'value', 'column'])
+
+
+def lex(line):
+    """
+    Yields the lexemes of a line. Nothing is yielded for a blank line.
+    :param line: (str) one line of input, without its newline character.
+    :return: generator of Lexemes; raises IllegalCharacterException for single
+        quotes and InvalidPattern for unterminated strings.
+    """
+    end = 0
+    length = len(line)
+    while True:
+        # Skip to the start of the next word
+        while end < length and line[end] == ' ':
+            end += 1
+        if end == length:
+            return
+        start = end
+        end = line.find(' ', start)
+        if end == -1:
+            end = length
+        first = line[start]
+
+        if first == '#':
+            yield Lexeme(COMMENT, line[start:], start + 1)
+            return
+        elif first == "'":
+            raise IllegalCharacterException(
+                "Double quotes only please, no single quotes allowed (column {0}).".format(start + 1)
+            )
+
+        quotes = line.count('"', start, end)
+        if quotes % 2:
+            # The string runs to the end of the next word with a double quote
+            close = line.find('"', end)
+            if close == -1:
+                raise InvalidPattern(
+                    "Could not find matching double-quote for arbitrary command at column {0}.".format(start + 1)
+                )
+            end = line.find(' ', close)
+            if end == -1:
+                end = length
+            text = ' '.join(word for word in line[start:end].split(' ') if word)
+        else:
+            text = line[start:end]
+
+        number = None
+        if not quotes and (text[-1].isdigit() or text[-1].isspace()):  # Anything int() accepts ends like this
+            try:
+                number = int(text)
+            except ValueError:
+                pass
+
+        if quotes and text[0] == '"' and text[-1] == '"':
+            yield Lexeme(STRING, text[1:-1], start + 1)
+        elif number is not None:
+            yield Lexeme(INTEGER, number, start + 1)
+        else:
+            yield Lexeme(WORD, text, start + 1)
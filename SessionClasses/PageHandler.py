@@ -1,8 +1,11 @@
-import os
+import functools
 
 from SessionClasses.Exceptions.TestSessionExceptions import *
+from SessionClasses.Registry import get_registry
 from SessionClasses.WaitCommands import *
 
+URL_CACHE_SIZE = 1024  # Number of URLs whose Page Object is memoized by each PageHandler
+
 
 class PageHandler:
     """
@@ -10,7 +13,9 @@ class PageHandler:
     information. This never sees the web-driver: that code is in PortalHandler.py.
     """
     def __init__(self):
-        self.page_objects = dict()  # Set in import_page_objects
+        self.page_objects = dict()  # Set in set_page_objects
+        self.page_index = dict()  # Page object ids mapped to their (position, page object), see set_page_index
+        self.find_page_object = functools.lru_cache(maxsize=URL_CACHE_SIZE)(self.find_page_object_by_url)
 
     def get_current_page(self, portal):
         """
@@ -18,38 +23,48 @@ class PageHandler:
         Searches all the Page Objects for a match before raising an UnknownPageObject error.
         Still a work in progress as paradigms for parsing URL's are developed.
         """
-        for _, page_object in self.page_objects.items():
-            # Check whether current URL is an exact match of the Page Object's id
-            if portal.driver.current_url == page_object.id:
-                return page_object
-            # Check whether the URL without a query matches the id
-            if '?' in portal.driver.current_url:
-                url_no_params = portal.driver.current_url.split('?')[0]
-                if url_no_params == page_object.id:
-                    return page_object
-            # Check whether the URL without a click-through matches the id
-            if '#' in portal.driver.current_url:
-                url_no_params = portal.driver.current_url.split('#')[0]
-                if url_no_params == page_object.id:
-                    return page_object
-            # Check whether the complete path is recognized
-            url_no_params = portal.driver.current_url.split('?')[0]
-            url_no_click_through = url_no_params.split('#')[0]
-            path = url_no_click_through.split('/')
-            if page_object.id == path[-1]:
-                return page_object
-            # Check whether a partial path is recognized
-            else:
-                partial_path = path[-1]
-                for p in path[-2:0:-1]:
-                    # if p.count('.') > 1:
-                    #     break
-                    if page_object.id == partial_path:
-                        return page_object
-                    else:
-                        partial_path = '/'.join([p, partial_path])
-        else:
-            raise UnknownPageError("Could not find a corresponding Page Object for the current page.")
+        current_url = portal.driver.current_url
+        page_object = self.find_page_object(current_url)
+        if page_object is None:
+            raise UnknownPageError(current_url)
+        return page_object
+
+    def find_page_object_by_url(self, url):
+        """
+        Looks up every form of the URL which a Page Object's id may match. If several
+        Page Objects match, the first one in page_objects wins.
+        Results are memoized by URL in find_page_object.
+        :param url: (str) the web-driver's current URL.
+        :return: matching Page Object, or None.
+        """
+        matches = [self.page_index[c] for c in self.get_url_candidates(url) if c in self.page_index]
+        return min(matches, key=lambda m: m[0])[1] if matches else None
+
+    @staticmethod
+    def get_url_candidates(url):
+        """
+        Returns the forms of a URL which are compared to Page Object ids:
+        the exact URL, the URL without a query, the URL without a click-through,
+        and the partial paths ending in the last path segment.
+        :param url: (str) URL to be matched.
+        :return: (list - str) candidate ids.
+        """
+        candidates = [url]
+        # Check whether the URL without a query matches the id
+        if '?' in url:
+            candidates.append(url.split('?')[0])
+        # Check whether the URL without a click-through matches the id
+        if '#' in url:
+            candidates.append(url.split('#')[0])
+        # Check whether the complete path is recognized
+        path = url.split('?')[0].split('#')[0].split('/')
+        candidates.append(path[-1])
+        # Check whether a partial path is recognized
+        partial_path = path[-1]
+        for p in path[-2:0:-1]:
+            candidates.append(partial_path)
+            partial_path = '/'.join([p, partial_path])
+        return candidates
 
     def get_page_objects(self):
         """
@@ -59,39 +74,22 @@ class PageHandler:
 
     def set_page_objects(self):
         """
-        Iterates through the PageObjects directory to import each class from
-        each module. It's important to keep the module and class names the same
-        for this code to work.
-        TODO Create dict with module-class pairs if there's a mismatch, then report.
+        Points this handler at the page objects in the PageObjects directory.
+        They are only imported the first time any handler in the process calls
+        this, see Registry.get_registry.
         """
-        def get_page_names():
-            """
-            Returns all the page object names from the PageObjects directory.
-            This is designed to recognize all .py files and consider them as PageObjects.
-            This is agnostic to the constraints set in import_page_objects.
-            :return: list of page names.
-            """
-            found_page_object_names = list()
-            file_path = '\\'.join(os.path.realpath(__file__).split('\\')[:-2])
-            for _, __, f in os.walk(os.path.join(file_path, 'PageObjects')):
-                for i in f:
-                    if i.endswith('.py'):
-                        found_page_object_names.append(i[:-3])
-            return found_page_object_names
+        self.page_objects = get_registry().page_objects
+        self.set_page_index()
 
-        for module_name in get_page_names():
-            try:
-                exec('from PageObjects.{0} import {0}'.format(module_name))
-            except Exception as err:
-                m = "Detected a naming convention issue in the file '{1}.py'.\n"\
-                    "Update the module or class name to match each other.\n"\
-                    "Error: {0}".format(err, module_name)
-                print(m)
-            else:
-                self.page_objects.setdefault(
-                    module_name,
-                    eval('locals()["{0}"]()'.format(module_name))
-                )
+    def set_page_index(self):
+        """
+        Indexes the page objects by id, keeping the position of the first page
+        object with each id so lookups match the order of page_objects.
+        """
+        self.page_index = dict()
+        for position, page_object in enumerate(self.page_objects.values()):
+            self.page_index.setdefault(page_object.id, (position, page_object))
+        self.find_page_object.cache_clear()
 
     @staticmethod
     def verify_page_has_loaded(current_page_object, portal):
@@ -0,0 +1,86 @@
+"""
+Keeps the session's page object and page-related commands up to date without
+re-checking the page before every line.
+
+A refresh finds the current page object, sets its commands, scans for windowed
+element commands and waits for the page to load. That takes several web driver
+calls, so it only runs when the URL, the window handle or a fingerprint of the
+DOM has changed since the last refresh. The fingerprint includes which widgets,
+dialogs and panes are displayed, so showing one refreshes the windowed element
+commands even if the page's text did not change.
+"""
+
+from selenium.common.exceptions import WebDriverException
+
+from .ElementCache import get_element_cache
+from .FrameTracker import get_frame_tracker
+
+# Widgets, dialogs and panes which are shown and hidden without changing the page's text
+WIDGET_SELECTOR = '[widgetid], [role="dialog"], [role="menu"], [role="tabpanel"]'
+
+# arguments: WIDGET_SELECTOR. Returns the URL, the number of elements, a hash of the text of
+# the page, and the number of displayed widgets with a hash of their class and style
+# attributes. Reads the top document, so the driver can stay in a frame (see FrameTracker)
+# unless it is cross-origin.
+FINGERPRINT_SCRIPT = """
+var doc = document;
+try { doc = window.top.document; } catch (e) {}
+var hash = function (h, text) {
+    for (var i = 0; i < text.length; i++) {
+        h = (h * 31 + text.charCodeAt(i)) | 0;
+    }
+    return h;
+};
+var widgets = doc.querySelectorAll(arguments[0]), displayed = 0, state = 0;
+for (var i = 0; i < widgets.length; i++) {
+    var widget = widgets[i];
+    state = hash(state, (widget.getAttribute('class') || '') + '|' + (widget.getAttribute('style') || '') + '|');
+    if (widget.getClientRects().length) {
+        displayed++;
+    }
+}
+return [doc.URL, doc.getElementsByTagName('*').length, hash(0, doc.body ? doc.body.textContent : ''), displayed, state];
+"""
+
+
+class PageTracker:
+    """
+    Refreshes a session's page state only when the page has changed.
+    """
+    def __init__(self):
+        self.fingerprint = None
+        self.refreshes = 0
+        self.skipped = 0
+
+    def get_fingerprint(self, driver):
+        """
+        :param driver: web driver object.
+        :return: (tuple) window handle, URL, element count, text hash and widget state; or
+            None if the page could not be read, which forces a refresh.
+        """
+        try:
+            return (driver.current_window_handle,) + tuple(driver.execute_script(FINGERPRINT_SCRIPT, WIDGET_SELECTOR))
+        except WebDriverException:
+            return None
+
+    def update(self, session):
+        """
+        Refreshes the session's current page object and commands if the page has
+        changed since the last refresh. Call this before running each line.
+        :param session: InteractiveSession or AutomatedSession.
+        """
+        fingerprint = self.get_fingerprint(session.portal.driver)
+        if fingerprint is not None and fingerprint == self.fingerprint:
+            self.skipped += 1
+            return
+
+        get_element_cache(session.portal.driver).clear()  # Elements found on the last page may be stale
+        get_frame_tracker(session.portal.driver).reset(session.portal.driver)
+        session.current_page_object = session.pages.get_current_page(session.portal)
+        session.commands.set_current_page_commands(session.current_page_object)
+        session.commands.set_visible_element_commands(session.portal, session.current_page_object)
+        session.pages.verify_page_has_loaded(session.current_page_object, session.portal)
+        # Kept only once the refresh succeeded, so a failed refresh is retried by the next line.
+        # It was taken before refreshing: if the page changes meanwhile, the next line refreshes again
+        self.fingerprint = fingerprint
+        self.refreshes += 1
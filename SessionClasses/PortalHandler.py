@@ -3,7 +3,10 @@ import sys
 from selenium import webdriver
 from selenium.common.exceptions import WebDriverException
 
+from SessionClasses.ElementCache import ElementCache
 from SessionClasses.Exceptions.PortalExceptions import *
+from SessionClasses.FrameTracker import FrameTracker
+from SessionClasses.SettleDetector import SettleStats
 
 
 class Portal:
@@ -11,20 +14,49 @@ class Portal:
     Handles all site-specific work for the selenium web driver, and any
     endpoint-related work as well.
     """
-    def __init__(self, browser, endpoint):
+    def __init__(self, browser, endpoint, explicit_waits=False, settle_timeout=5, fast_fill=False,
+                 settle_quiet_ms=150):
         """
         Opens browser and navigates to the first page.
+        :param explicit_waits: (bool) if True, the driver has no implicit wait. Element
+            lookups either wait under an explicit deadline or check once, see
+            WaitCommands.find_element and DomProbe.
+        :param settle_timeout: (int) seconds commands such as click wait for the
+            page to settle, see SettleDetector.
+        :param fast_fill: (bool) if True, fill and fill_unique set values with a
+            script instead of typing them, see FastFill.
+        :param settle_quiet_ms: (int) milliseconds the DOM must not change for the
+            page to count as settled, see SettleDetector.
         """
         self.browser = browser
         self.endpoint = endpoint
 
         self.inverse_endpoint = self.get_inverse_endpoint(self.endpoint)
-        self.implicit_wait_amt = 2
+        self.explicit_waits = explicit_waits
+        self.implicit_wait_amt = 0 if explicit_waits else 2
+        self.element_wait_amt = 2  # Deadline of WaitCommands.find_element in explicit-wait mode
+        self.settle_timeout = settle_timeout
+        self.settle_quiet_ms = settle_quiet_ms
+        self.fast_fill = fast_fill
+        self.settle_stats = SettleStats()
+        self.element_cache = ElementCache()
+        self.frame_tracker = FrameTracker()
+        self.uses = 0  # Number of test files run in this browser, see PortalPool
 
         self.driver = self.set_driver(browser)
         self.driver.implicitly_wait(self.implicit_wait_amt)
         self.driver.maximize_window()
 
+        # Read by WaitCommands, which only sees the driver
+        self.driver.explicit_waits = self.explicit_waits
+        self.driver.element_wait_amt = self.element_wait_amt
+        self.driver.settle_timeout = self.settle_timeout
+        self.driver.settle_quiet_ms = self.settle_quiet_ms
+        self.driver.fast_fill = self.fast_fill
+        self.driver.settle_stats = self.settle_stats
+        self.driver.element_cache = self.element_cache
+        self.driver.frame_tracker = self.frame_tracker
+
     @staticmethod
     def get_inverse_endpoint(endpoint):
         """
@@ -89,3 +121,118 @@ class Portal:
         This comment takes up more space than the rest of the function.
         """
         self.driver.close()
+
+    def quit(self):
+        """
+        Closes every window and ends the web driver's process.
+        """
+        try:
+            self.driver.quit()
+        except WebDriverException:
+            pass  # The browser has already crashed or been closed
+
+    def reset(self):
+        """
+        Returns a used browser to a clean state so the next test file can use it.
+        Closes any extra windows, then clears cookies and storage for both the last
+        visited site and the endpoint. Cookies set by other domains are not cleared,
+        so set a low reuse limit in PortalPool if tests log into other sites.
+        Raises a WebDriverException if the browser is no longer responding.
+        """
+        handles = self.driver.window_handles
+        for handle in handles[1:]:
+            self.driver.switch_to.window(handle)
+            self.driver.close()
+        self.driver.switch_to.window(handles[0])
+        self.frame_tracker.reset(self.driver)
+        self.element_cache.clear()
+        self.clear_site_data()
+        self.driver.get(self.endpoint)
+        self.clear_site_data()
+        self.driver.test = dict()
+
+    def responding(self):
+        """
+        Checks with one cheap call whether the browser still answers.
+        :return: (bool) False if the browser or its web driver has crashed.
+        """
+        try:
+            self.driver.title
+        except Exception:  # A driver whose process has died raises connection errors, not WebDriverExceptions
+            return False
+        return True
+
+    def clear_site_data(self):
+        """
+        Deletes the cookies, local storage and session storage of the current site.
+        """
+        self.driver.delete_all_cookies()
+        self.driver.execute_script(
+            "try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}"
+        )
+
+
+class PortalPool:
+    """
+    Leases warm browsers to test files instead of starting a new browser for each file.
+    """
+    def __init__(self, browser, endpoint, max_uses=25, explicit_waits=False, settle_timeout=5,
+                 fast_fill=False, settle_quiet_ms=150):
+        """
+        :param browser: (str) name of the browser each Portal opens.
+        :param endpoint: (str) URL each Portal is reset to between test files.
+        :param max_uses: (int) number of test files a browser runs before it is replaced.
+        :param explicit_waits: (bool) passed to each new Portal.
+        :param settle_timeout: (int) passed to each new Portal.
+        :param fast_fill: (bool) passed to each new Portal.
+        :param settle_quiet_ms: (int) passed to each new Portal.
+        """
+        self.browser = browser
+        self.endpoint = endpoint
+        self.max_uses = max_uses
+        self.explicit_waits = explicit_waits
+        self.settle_timeout = settle_timeout
+        self.settle_quiet_ms = settle_quiet_ms
+        self.fast_fill = fast_fill
+        self.available = list()
+
+    def lease(self):
+        """
+        Returns an idle Portal which has been reset, or a new Portal if none are idle.
+        Either way the browser has loaded the endpoint, so the test file can start.
+        Idle Portals which fail to reset are assumed to have crashed and are discarded.
+        """
+        while self.available:
+            portal = self.available.pop()
+            try:
+                portal.reset()
+            except WebDriverException:
+                portal.quit()
+            else:
+                return portal
+        portal = Portal(
+            self.browser, self.endpoint, self.explicit_waits, self.settle_timeout, self.fast_fill, self.settle_quiet_ms
+        )
+        portal.navigate_to_page(self.endpoint)
+        return portal
+
+    def release(self, portal, crashed=False):
+        """
+        Returns a leased Portal to the pool, or quits it once it has been used
+        max_uses times or if the test file crashed.
+        :param portal: Portal returned by lease().
+        :param crashed: (bool) True if the test file ended with an unexpected error, or
+            the browser stopped responding, see Portal.responding.
+        """
+        portal.uses += 1
+        if crashed or portal.uses >= self.max_uses:
+            portal.quit()
+        else:
+            self.available.append(portal)
+
+    def close(self):
+        """
+        Quits every idle browser. Call this once the test session has finished.
+        """
+        while self.available:
+            self.available.pop().quit()
@@ -0,0 +1,202 @@
+"""
+Process-wide registry of the static commands and page objects.
+Importing and inspecting the Commands and PageObjects directories is done once,
+the first time get_registry() is called, and the result is shared by every
+test file, browser and worker in the process.
+"""
+
+import collections
+import hashlib
+import importlib
+import inspect
+import os
+import types
+
+from .FrameTracker import get_frame_index
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+# Argument metadata of a command function, built once by get_signature and shared by every
+# command Token for that function, which reads it through its args and default_args properties
+Signature = collections.namedtuple('Signature', ['args', 'default_args', 'unpack_args', 'unpack_kwargs'])
+
+# Token types a word is matched against, highest precedence first
+COMMAND_PRECEDENCE = ['ARG_CMD', 'ASSERTION_CMD', 'GENERAL_CMD', 'PAGE_ELEMENT', 'PORTAL_CMD', 'WINDOWED_ELEMENT']
+
+
+def build_command_index(layers):
+    """
+    Merges layers of commands into one lookup table. A name found in more than
+    one layer is given the type of the layer with the highest precedence.
+    :param layers: (dict) commands keyed by token type, see COMMAND_PRECEDENCE.
+    :return: (tuple) the index, a dict of (token type, function) keyed by command
+        name; and a list of (name, token type used, token type shadowed) collisions.
+    """
+    index, collisions = dict(), list()
+    for token_type in COMMAND_PRECEDENCE:
+        for name, func in layers.get(token_type, dict()).items():
+            if name in index:
+                collisions.append((name, index[name][0], token_type))
+            else:
+                index[name] = (token_type, func)
+    return index, collisions
+
+
+def report_command_collisions(collisions, source):
+    """
+    Prints a warning for each command name which hides another command.
+    :param collisions: (list - tuples) collisions returned by build_command_index.
+    :param source: (str) where the commands were defined, for the message.
+    """
+    for name, used_type, shadowed_type in collisions:
+        m = "WARNING: \"{0}\" is defined as both {1} and {2} in {3}; {1} is used." \
+            " Rename one of them to make both available."
+        print(m.format(name, used_type, shadowed_type, source))
+
+
+def get_signature(func):
+    """
+    Builds the argument metadata of a command function.
+    Note that the inspect module has no way to build an association between
+    default arguments and their values, so we have to improvise a bit by
+    assuming the reversed "args" and "defaults" properties can be zipped.
+    :param func: command function.
+    :return: (Signature) required args, default args and their values, and the
+        names of any *args or **kwargs parameters.
+    """
+    arg_spec = inspect.getfullargspec(func)
+    args = tuple(a for a in arg_spec.args if not a.startswith('default') and not a.startswith('_'))
+    default_args = dict()
+    if arg_spec.defaults:
+        zipped = zip(reversed(arg_spec.args), reversed(arg_spec.defaults))
+        default_args = {e[0]: e[1] for e in list(zipped)}
+    return Signature(args, types.MappingProxyType(default_args), arg_spec.varargs, arg_spec.varkw)
+
+
+class Registry:
+    """
+    Read-only collection of every static command, its signature, and every page object.
+    """
+    def __init__(self):
+        command_dicts = {
+            'GeneralCommands': dict(),
+            'PortalCommands': dict(),
+            'MacroCommands': dict(),
+            'AssertionCommands': dict(),
+            'ArgumentCommands': dict()
+        }
+        function_args = dict()
+        for module_name in self.get_module_names('Commands'):
+            module = importlib.import_module('Commands.{0}'.format(module_name))
+            classes = {
+                c[0]: c[1] for c in inspect.getmembers(module, inspect.isclass) if c[0] == module_name
+            }
+            for class_name, class_object in classes.items():
+                functions = {
+                    f[0]: f[1] for f in inspect.getmembers(
+                        class_object, inspect.isfunction
+                    ) if not (f[0].startswith('_') or f[0].endswith('_'))
+                }
+                for func_name, func_object in functions.items():
+                    command_dicts[module_name].setdefault(func_name, func_object)
+                function_args.update(class_object.function_args)
+
+        self.general_commands = types.MappingProxyType(command_dicts['GeneralCommands'])
+        self.portal_commands = types.MappingProxyType(command_dicts['PortalCommands'])
+        self.macro_commands = types.MappingProxyType(command_dicts['MacroCommands'])
+        self.assertion_commands = types.MappingProxyType(command_dicts['AssertionCommands'])
+        self.function_args = types.MappingProxyType(function_args)
+        self.signatures = types.MappingProxyType({
+            func: get_signature(func) for commands in command_dicts.values() for func in commands.values()
+        })
+        self.page_objects = types.MappingProxyType(self.load_page_objects())
+        self.fingerprint = self.get_fingerprint()
+
+        # Lookup table of the static commands; CommandHandler adds the current page's commands to a copy
+        index, collisions = build_command_index({
+            'ARG_CMD': {v: None for values in function_args.values() for v in values},
+            'ASSERTION_CMD': self.assertion_commands,
+            'GENERAL_CMD': self.general_commands,
+            'PORTAL_CMD': self.portal_commands
+        })
+        report_command_collisions(collisions, 'the Commands directory')
+        self.command_index = types.MappingProxyType(index)
+        for module_name, page_object in sorted(self.page_objects.items()):
+            report_command_collisions(self.find_page_collisions(page_object), module_name)
+
+    def get_fingerprint(self):
+        """
+        Hashes the source of every command and page object module, so anything
+        derived from the registry can tell whether it is out of date.
+        :return: (str) hex digest.
+        """
+        digest = hashlib.sha1()
+        for directory in ['Commands', 'PageObjects']:
+            for module_name in sorted(self.get_module_names(directory)):
+                with open(os.path.join(ROOT_DIR, directory, module_name + '.py'), 'rb') as module_file:
+                    digest.update(module_name.encode())
+                    digest.update(module_file.read())
+        return digest.hexdigest()
+
+    def find_page_collisions(self, page_object):
+        """
+        :param page_object: page object instance.
+        :return: (list - tuples) collisions between the page's elements and the static commands.
+        """
+        names = dict(page_object.page_elements)
+        for elements in page_object.window_elements.values():
+            names.update(elements)
+        collisions = list()
+        for name in names:
+            if name in self.command_index:
+                static_type = self.command_index[name][0]
+                if COMMAND_PRECEDENCE.index(static_type) < COMMAND_PRECEDENCE.index('PAGE_ELEMENT'):
+                    collisions.append((name, static_type, 'PAGE_ELEMENT'))
+                else:
+                    collisions.append((name, 'PAGE_ELEMENT', static_type))
+        return collisions
+
+    @staticmethod
+    def get_module_names(directory):
+        """
+        Returns the names of the non-special .py files in the root of a directory.
+        :param directory: (str) name of a folder in the project's root directory.
+        :return: list of module names.
+        """
+        for _, __, files in os.walk(os.path.join(ROOT_DIR, directory)):
+            return [f[:-3] for f in files if f.endswith('.py') and not f.startswith('__')]
+        return list()
+
+    def load_page_objects(self):
+        """
+        Imports each class from each module in the PageObjects directory.
+        It's important to keep the module and class names the same
+        for this code to work.
+        :return: dict of page object instances keyed by their module name.
+        """
+        page_objects = dict()
+        for module_name in self.get_module_names('PageObjects'):
+            try:
+                page_class = getattr(importlib.import_module('PageObjects.{0}'.format(module_name)), module_name)
+            except Exception as err:
+                m = "Detected a naming convention issue in the file '{1}.py'.\n"\
+                    "Update the module or class name to match each other.\n"\
+                    "Error: {0}".format(err, module_name)
+                print(m)
+            else:
+                page_object = page_objects.setdefault(module_name, page_class())
+                get_frame_index(page_object)
+        return page_objects
+
+
+_registry = None  # Built by the first call to get_registry
+
+
+def get_registry():
+    """
+    :return: (Registry) the process' registry, building it if needed.
+    """
+    global _registry
+    if _registry is None:
+        _registry = Registry()
+    return _registry
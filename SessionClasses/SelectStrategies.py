@@ -0,0 +1,234 @@
+"""
+Finds the item select_item should click, and remembers which strategy found it.
+
+Each kind of drop-down, menu, grid or list lists its items differently, so
+select_item has one strategy per kind. The element's class decides which
+strategy applies. The first time an element is used, every strategy's items
+are searched in a single script call, and the strategy which found the item is
+remembered for that page object and element. Only the strategy the element's
+class selects, and strategies whose items are under the element, are used;
+the others search the whole document and could find another menu's item with
+the same text. Later calls only search the remembered strategy, and fall back
+to searching again if it stops working.
+
+Remembered strategies are saved to STRATEGY_FILE, so they carry over between runs.
+"""
+
+import collections
+import json
+import os
+
+from .Registry import ROOT_DIR
+
+STRATEGY_FILE = os.path.join(ROOT_DIR, 'SelectStrategies.json')
+
+# class_marker: substring of the element's class which selects the strategy; None for the default
+# relative: item_xpath is appended to the element's XPath; format_pane: format it with the page's visible_pane
+# target_css: descendant of the matching item which is clicked; script_click: click with a script
+SelectStrategy = collections.namedtuple(
+    'SelectStrategy', ['name', 'class_marker', 'relative', 'item_xpath', 'format_pane', 'target_css', 'script_click']
+)
+
+_multiselect_items = '(//div[@role="tabpanel"]//table[@data-dojo-attach-point="_aggregateTable"]' \
+                     '//div[@data-dojo-attach-point="wrapperDiv"])[last()-1]' \
+                     '//div[contains(@widgetid, "CheckedMultiSelectItem_")]'
+
+# In the order the element's class is checked against them
+STRATEGIES = [
+    SelectStrategy(  # Drop-downs which are not dojo
+        'dropdown', 'dropdown', True,
+        '//*[@class[contains(., "dropdown-link") and not(contains(., "hide"))]]', True, None, True
+    ),
+    SelectStrategy(  # Filtering drop-downs, as in save-in
+        'filtering_menu', 'dijitArrowButtonInner', False,
+        '//*[contains(@class,"dijitComboBoxMenuPopup") and not(contains(@style,"display") and contains(@style,"none"))]'
+        '//*[contains(@class, "dijitMenuItem")]', False, None, True
+    ),
+    SelectStrategy(
+        'menu', 'dijitMenuPopup', False, '//tr[contains(@id, "dijit_MenuItem_")]', False, None, True
+    ),
+    SelectStrategy(
+        'grid_links', 'dgrid-scroller', True, '//div[contains(@class,"dgrid-row")]//a', False, None, False
+    ),
+    SelectStrategy(
+        'layer_rows', 'esriAnalysisLayersGrid', True, '//div[contains(@class,"dgrid-row")]', False, None, False
+    ),
+    SelectStrategy(  # Filter-menu items
+        'accordion', 'accordion', False, '//*[contains(@class,"drp-accordion__title")]', False, None, False
+    ),
+    SelectStrategy(  # Filter >> Folder items
+        'folder', 'ftr-folder', False, '//*[contains(@class,"ftr-folder__item")]', False, None, False
+    ),
+    SelectStrategy(
+        'multiselect', 'MultiSelect', False, _multiselect_items, False, 'input[role="checkbox"]', False
+    ),
+    SelectStrategy(  # Dojo drop-downs
+        'dojo_menu', None, False,
+        '//*[contains(@class,"dijitMenuPopup") and not(contains(@style,"display") and contains(@style,"none"))]'
+        '//table//tr', False, None, True
+    ),
+]
+STRATEGIES_BY_NAME = {s.name: s for s in STRATEGIES}
+
+# arguments: element XPath, read the class?, [[item XPath, target CSS], ...], lowercase text.
+# Returns the element's class (or null) and, per strategy, the target of the first visible
+# item whose text matches, or null.
+SELECT_SCRIPT = """
+var readClass = arguments[1], strategies = arguments[2], wanted = arguments[3];
+var elementClass = null;
+if (readClass) {
+    try {
+        var elem = document.evaluate(
+            arguments[0], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+        ).singleNodeValue;
+        elementClass = elem ? (elem.getAttribute('class') || '') : '';
+    } catch (e) {
+        elementClass = '';
+    }
+}
+var found = [];
+for (var i = 0; i < strategies.length; i++) {
+    var target = null;
+    try {
+        var items = document.evaluate(
+            strategies[i][0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+        );
+        for (var j = 0; j < items.snapshotLength && !target; j++) {
+            var item = items.snapshotItem(j);
+            if (item.getClientRects().length && (item.innerText || '').trim().toLowerCase() === wanted) {
+                target = strategies[i][1] ? item.querySelector(strategies[i][1]) : item;
+            }
+        }
+    } catch (e) {}
+    found.push(target);
+}
+return [elementClass, found];
+"""
+
+
+class StrategyMemory:
+    """
+    Names of the strategies which worked, keyed by page object and element.
+    """
+    def __init__(self, path=STRATEGY_FILE):
+        """
+        :param path: (str) JSON file the strategies are saved to.
+        """
+        self.path = path
+        self.strategies = self.load()
+
+    def load(self):
+        """
+        :return: (dict) saved strategy names; empty if the file is missing or cannot be read.
+        """
+        try:
+            with open(self.path, 'r') as f:
+                strategies = json.load(f)
+        except (OSError, ValueError):
+            return dict()
+        return {k: v for k, v in strategies.items() if v in STRATEGIES_BY_NAME}
+
+    def get(self, key):
+        """
+        :return: (SelectStrategy) remembered strategy, or None.
+        """
+        name = self.strategies.get(key)
+        return STRATEGIES_BY_NAME.get(name)
+
+    def remember(self, key, strategy):
+        """
+        Remembers a strategy and saves it, keeping anything other processes saved
+        in the meantime. Failing to save is not an error.
+        :param key: (str) see get_key.
+        :param strategy: SelectStrategy which found the item.
+        """
+        if self.strategies.get(key) == strategy.name:
+            return
+        self.strategies = self.load()
+        self.strategies[key] = strategy.name
+        try:
+            temp_path = '{0}.{1}.tmp'.format(self.path, os.getpid())
+            with open(temp_path, 'w') as f:
+                json.dump(self.strategies, f, indent=4, sort_keys=True)
+            os.replace(temp_path, self.path)
+        except OSError as err:
+            print("WARNING: Could not save the select_item strategy: {0}".format(err))
+
+
+def get_key(page_object, page_element):
+    """
+    :return: (str) key of a page element in StrategyMemory.
+    """
+    return '{0}.{1}'.format(page_object.__class__.__name__, page_element.name)
+
+
+def get_item_xpath(strategy, page_object, element_xpath):
+    """
+    :return: (str) XPath expression of the strategy's items.
+    """
+    xpath = element_xpath + strategy.item_xpath if strategy.relative else strategy.item_xpath
+    if strategy.format_pane:
+        try:
+            return xpath.format(getattr(page_object, 'visible_pane', ''))
+        except (IndexError, KeyError, ValueError):
+            pass  # Braces which are not a placeholder; the expression is used as it is
+    return xpath
+
+
+def is_scoped(strategy, element_class):
+    """
+    :return: (bool) True if the strategy only finds items of this element: either
+        its items are under the element, or the element's class selects it.
+    """
+    return strategy.relative or (strategy.class_marker is not None and strategy.class_marker in element_class)
+
+
+def find_select_item(driver, page_object, page_element, text, memory):
+    """
+    Finds the element to click to select an item, with one script call, or two
+    if a remembered strategy no longer finds the item.
+    :param driver: Web driver object.
+    :param page_object: current page object.
+    :param page_element: Token of the drop-down, menu, grid or list.
+    :param text: (str) text of the item, in any case.
+    :param memory: StrategyMemory.
+    :return: (tuple) the SelectStrategy and the WebElement to click; (None, None) if
+        no strategy found the item.
+    """
+    wanted = text.lower()
+    key = get_key(page_object, page_element)
+    remembered = memory.get(key)
+    if remembered is not None:
+        candidates = [[get_item_xpath(remembered, page_object, page_element.func), remembered.target_css]]
+        _, found = driver.execute_script(SELECT_SCRIPT, page_element.func, False, candidates, wanted)
+        if found[0] is not None:
+            return remembered, found[0]
+
+    candidates = [[get_item_xpath(s, page_object, page_element.func), s.target_css] for s in STRATEGIES]
+    element_class, found = driver.execute_script(SELECT_SCRIPT, page_element.func, True, candidates, wanted)
+
+    # The strategy for the element's class comes first, then the strategies whose items are
+    # under the element. Other strategies search the whole document, so an item they find
+    # with the same text may belong to an unrelated menu.
+    preferred = next(s for s in STRATEGIES if s.class_marker is None or s.class_marker in element_class)
+    order = [preferred] + [s for s in STRATEGIES if s is not preferred and s.relative]
+    for strategy in order:
+        target = found[STRATEGIES.index(strategy)]
+        if target is not None:
+            if is_scoped(strategy, element_class):  # The default strategy is used, but not remembered
+                memory.remember(key, strategy)
+            return strategy, target
+    return None, None
+
+
+_memory = None  # Loaded by the first call to get_strategy_memory
+
+
+def get_strategy_memory():
+    """
+    :return: (StrategyMemory) the process' strategy memory, loading it if needed.
+    """
+    global _memory
+    if _memory is None:
+        _memory = StrategyMemory()
+    return _memory
@@ -0,0 +1,152 @@
+"""
+Waits for the page to settle after a command instead of sleeping for a fixed time.
+
+The page has settled when all of these are true:
+* document.readyState is "complete".
+* No XMLHttpRequest or fetch calls are in flight.
+* Dojo has no requests in flight and no dijit ContentPane is loading.
+* The DOM has not changed for QUIET_MS milliseconds.
+
+Request counting and the mutation observer are installed into the page by
+prepare_settle, which commands call just before they act, so requests the
+action itself starts are counted. A check also installs them if the action
+loaded a new page. The quiet period starts at the first check of every wait,
+so a command always gives the page at least its quiet period to react.
+
+Each wait is recorded in the driver's SettleStats, which the automated session
+logs after every test file.
+"""
+
+import collections
+import time
+
+from selenium.common.exceptions import WebDriverException
+
+from .WaitCommands import poll_until
+
+SETTLE_TIMEOUT = 5  # Defaults for drivers not created by a Portal
+QUIET_MS = 150
+
+# Installs request counting and the mutation observer, once per page
+INSTALL_SCRIPT = """
+var settle = window.__torkSettle;
+if (!settle) {
+    settle = window.__torkSettle = {requests: 0, changed: Date.now()};
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        settle.requests++;
+        this.addEventListener('loadend', function () { settle.requests--; });
+        return send.apply(this, arguments);
+    };
+    if (window.fetch) {
+        var fetch = window.fetch;
+        window.fetch = function () {
+            settle.requests++;
+            var done = function () { settle.requests--; };
+            var request = fetch.apply(this, arguments);
+            request.then(done, done);
+            return request;
+        };
+    }
+    if (window.MutationObserver && document.documentElement) {
+        new MutationObserver(function () { settle.changed = Date.now(); }).observe(
+            document.documentElement, {attributes: true, childList: true, characterData: true, subtree: true}
+        );
+    }
+}
+"""
+
+# arguments[0]: True on the first check of a wait. Returns [ready, requests in flight, busy, quiet ms]
+SETTLE_SCRIPT = INSTALL_SCRIPT + """
+if (arguments[0]) {
+    settle.changed = Date.now();
+}
+var busy = !!(window.dojo && window.dojo._inFlightCount > 0);
+var loading = document.querySelectorAll('.dijitContentPaneLoading');
+for (var i = 0; i < loading.length && !busy; i++) {
+    busy = loading[i].getClientRects().length > 0;
+}
+return [document.readyState === 'complete', Math.max(settle.requests, 0), busy, Date.now() - settle.changed];
+"""
+
+
+class SettleStats:
+    """
+    Time spent waiting for the page to settle, per command.
+    """
+    Entry = collections.namedtuple('Entry', ['count', 'total', 'longest', 'timeouts'])
+
+    def __init__(self):
+        self.entries = dict()
+
+    def record(self, command, seconds, settled):
+        """
+        :param command: (str) name of the command which waited.
+        :param seconds: (float) time spent waiting.
+        :param settled: (bool) False if the wait ran out of time.
+        """
+        entry = self.entries.get(command, self.Entry(0, 0.0, 0.0, 0))
+        self.entries[command] = self.Entry(
+            entry.count + 1, entry.total + seconds, max(entry.longest, seconds), entry.timeouts + (not settled)
+        )
+
+    def get_summary(self):
+        """
+        :return: (list - str) one line per command, sorted by name.
+        """
+        return [
+            "{0}: {1} waits, {2:.2f}s average, {3:.2f}s longest, {4} timed out".format(
+                command, e.count, e.total / e.count, e.longest, e.timeouts
+            ) for command, e in sorted(self.entries.items())
+        ]
+
+    def reset(self):
+        self.entries = dict()
+
+
+def prepare_settle(driver):
+    """
+    Installs request counting and the mutation observer into the current page, if
+    they are not installed yet. Call this before a command acts, then call
+    wait_for_settle after it. Failing to install is not an error; the first
+    check installs them instead.
+    :param driver: Web driver object.
+    """
+    try:
+        driver.execute_script(INSTALL_SCRIPT)
+    except WebDriverException:
+        pass
+
+
+def page_is_settled(driver, first_check=False):
+    """
+    :param driver: Web driver object.
+    :param first_check: (bool) True to restart the quiet period.
+    :return: (bool) True if the page has settled.
+    """
+    ready, requests, busy, quiet_ms = driver.execute_script(SETTLE_SCRIPT, first_check)
+    return ready and not requests and not busy and quiet_ms >= getattr(driver, 'settle_quiet_ms', QUIET_MS)
+
+
+def wait_for_settle(driver, command):
+    """
+    Waits until the page has settled or the driver's settle_timeout has passed,
+    and records the wait in the driver's settle_stats. Scripts fail while a page
+    is unloading; that counts as not settled.
+    :param driver: Web driver object.
+    :param command: (str) name of the command which waited, for the statistics.
+    :return: (bool) True if the page settled in time.
+    """
+    timeout = getattr(driver, 'settle_timeout', SETTLE_TIMEOUT)
+    checks = [True]  # Only the first check restarts the quiet period
+
+    def check():
+        first_check, checks[0] = checks[0], False
+        return page_is_settled(driver, first_check)
+
+    start = time.monotonic()
+    settled = bool(poll_until(check, timeout, ignored_exceptions=(WebDriverException,)))
+    stats = getattr(driver, 'settle_stats', None)
+    if stats is not None:
+        stats.record(command, time.monotonic() - start, settled)
+    return settled
@@ -0,0 +1,201 @@
+"""
+Compiles test files into execution plans before any browser is started.
+Each line is parsed, its static commands are resolved, its arguments are typed
+and its default arguments are expanded once. Words which depend on the current
+page (page elements, windowed elements, session arguments and temporary
+variables) are kept as WORD items and resolved when the line is run, see
+CommandHandler.execute_plan_line.
+
+Plans are cached in PLAN_CACHE_DIR, keyed by a hash of the test file and the
+registry's fingerprint, so a plan is only rebuilt when either one changes.
+"""
+
+import collections
+import hashlib
+import io
+import json
+import locale
+import os
+import sys
+
+from .CommandHandler import CommandHandler, Token
+from .Exceptions.CommandExceptions import InvalidPattern, NoCommandsFound
+from .Lexer import COMMENT, lex
+from .Registry import ROOT_DIR, get_registry
+
+PLAN_CACHE_DIR = os.path.join(ROOT_DIR, 'PlanCache')
+PLAN_VERSION = 2  # Increase when the plan format changes to ignore older cached plans
+
+# items: list of (token type, name, original word or None) tuples
+PlanLine = collections.namedtuple('PlanLine', ['line_number', 'text', 'items'])
+
+
+class ExecutionPlan:
+    """
+    Compiled test file: the lines to run, plus any errors found while compiling.
+    """
+    def __init__(self, lines, errors):
+        """
+        :param lines: (list - PlanLine) lines which contain commands, in file order.
+        :param errors: (list - tuples) line number, line text and error message of each invalid line.
+        """
+        self.lines = lines
+        self.errors = errors
+
+    def to_json(self):
+        return json.dumps([[line.line_number, line.text, line.items] for line in self.lines])
+
+    @classmethod
+    def from_json(cls, text):
+        lines = [PlanLine(n, t, [tuple(item) for item in items]) for n, t, items in json.loads(text)]
+        return cls(lines, list())
+
+
+class TestCompiler:
+    """
+    Turns test files into ExecutionPlans and caches them in memory and on disk.
+    """
+    def __init__(self, cache_dir=PLAN_CACHE_DIR):
+        """
+        :param cache_dir: (str) folder for cached plans; created if it does not exist.
+        """
+        self.cache_dir = cache_dir
+        self.commands = CommandHandler()
+        self.commands.set_static_commands()
+        self.plans = dict()  # In-memory cache, keyed the same as the disk cache
+
+    def compile(self, test_file):
+        """
+        Returns the execution plan of a test file, compiling it if no cached plan exists.
+        :param test_file: (str) full path to the test file.
+        :return: ExecutionPlan; check its errors attribute before running it.
+        """
+        with open(test_file, 'rb') as f:
+            content = f.read()
+        key = self.get_cache_key(content)
+        if key in self.plans:
+            return self.plans[key]
+
+        plan = self.load_plan(key)
+        if plan is None:
+            text = content.decode(locale.getpreferredencoding(False))
+            plan = self.compile_lines(io.StringIO(text, newline=None))
+            if not plan.errors:
+                self.save_plan(key, plan)
+        self.plans[key] = plan
+        return plan
+
+    def compile_lines(self, lines):
+        """
+        Compiles each line the way AutomatedSession reads test files: blank lines
+        and lines starting with "#" are skipped.
+        :param lines: iterable of lines, including their newline characters.
+        :return: ExecutionPlan
+        """
+        plan_lines, errors = list(), list()
+        group_start = None  # PlanLine of the assertion group which is open, if any
+        for e, line in enumerate(lines):
+            if line == '\n' or line.startswith('#'):
+                continue
+            line = line.strip('\n')
+            try:
+                items = self.compile_line(line)
+                if items:
+                    group_start = self.check_assertion_group(PlanLine(e + 1, line, items), group_start)
+            except Exception:  # Any exception here would have been raised while running the line
+                errors.append((e + 1, line, '{0} {1}'.format(sys.exc_info()[0].__name__, sys.exc_info()[1])))
+            else:
+                if items:
+                    plan_lines.append(PlanLine(e + 1, line, items))
+        if group_start is not None:
+            errors.append((group_start.line_number, group_start.text, 'InvalidPattern assert_group_end is missing'))
+        return ExecutionPlan(plan_lines, errors)
+
+    @staticmethod
+    def check_assertion_group(plan_line, group_start):
+        """
+        Checks that assertion groups are closed before they are reopened, and only
+        hold assertions. Commands other than assertions would run before the
+        group's assertions, see AssertionGroup.
+        :param plan_line: (PlanLine) compiled line.
+        :param group_start: (PlanLine) line which opened the current group, or None.
+        :return: (PlanLine) line which opened the group after this line, or None;
+            raises InvalidPattern for lines which break those rules.
+        """
+        token_type, command, _ = plan_line.items[0]
+        if command == 'assert_group_start':
+            if group_start is not None:
+                raise InvalidPattern("The assertion group started on line {0} is not ended.".format(group_start.line_number))
+            return plan_line
+        elif command == 'assert_group_end':
+            if group_start is None:
+                raise InvalidPattern("assert_group_end found without assert_group_start.")
+            return None
+        elif group_start is not None and token_type != 'ASSERTION_CMD':
+            raise InvalidPattern("Only assertions can be grouped; end the group started on line {0} first.".format(
+                group_start.line_number
+            ))
+        return group_start
+
+    def compile_line(self, line):
+        """
+        Parses, tokenizes and validates a single line without a browser.
+        :param line: (str) line of a test file.
+        :return: (list - tuples) plan items, or an empty list if the line only holds a comment.
+        """
+        if not line.strip(' '):
+            raise NoCommandsFound("I beg your pardon?")
+
+        tokens, words = list(), dict()
+        for lexeme in lex(line):
+            if lexeme.type == COMMENT:
+                break  # Ignore anything following the comment character ("#")
+            token = self.commands.tokenize_lexeme(lexeme, dict())
+            if token is None:
+                token = Token(lexeme.value, 'WORD')  # Resolved when the line is run
+            elif token.type in ['ASSERTION_CMD', 'GENERAL_CMD', 'PORTAL_CMD', 'ARG_CMD']:
+                words[id(token)] = lexeme.value
+            tokens.append(token)
+        if not tokens:
+            return list()
+        if tokens[0].type == 'WORD':
+            self.commands.report_unrecognized_input([tokens[0].name])
+
+        tokens = self.commands.generate_default_tokens(tokens)
+        self.commands.validate_tokens(tokens)
+        return [(t.type, t.name, words.get(id(t))) for t in tokens]
+
+    @staticmethod
+    def get_cache_key(content):
+        """
+        :param content: (bytes) content of the test file.
+        :return: (str) hash of the plan format, the registry and the test file.
+        """
+        digest = hashlib.sha1()
+        digest.update(str(PLAN_VERSION).encode())
+        digest.update(get_registry().fingerprint.encode())
+        digest.update(content)
+        return digest.hexdigest()
+
+    def load_plan(self, key):
+        """
+        :return: cached ExecutionPlan, or None if it has not been cached or cannot be read.
+        """
+        try:
+            with open(os.path.join(self.cache_dir, key + '.json'), 'r') as f:
+                return ExecutionPlan.from_json(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def save_plan(self, key, plan):
+        """
+        Writes a plan to the cache. Failing to cache a plan is not an error.
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = os.path.join(self.cache_dir, '{0}.{1}.tmp'.format(key, os.getpid()))
+            with open(temp_path, 'w') as f:
+                f.write(plan.to_json())
+            os.replace(temp_path, os.path.join(self.cache_dir, key + '.json'))
+        except OSError as err:
+            print("WARNING: Could not cache the execution plan: {0}".format(err))
@@ -6,24 +6,23 @@ Check out the implicit wait set by the Portal class upon driver
 creation-- that's basically a back-up for when we don't utilize these
 wait functions.
 
+Every wait here, and every assertion in AssertionCommands, polls through
+poll_until: the first checks are 50 milliseconds apart and back off
+to a capped interval, and timeouts are measured on the monotonic clock.
+
 PARAMETER DOC:
 * driver: web driver provided by the Portal class.
 * pattern: string used to find the element, based on method.
-* timeout: implicit wait time; throws an exception if the polled element hasn't
-    been found by this time. Default is 5.
+* timeout: number of seconds to keep polling before giving up. Default is 5.
 * element_type: identifying attribute for a web element. Default is ID.
 """
 
-import os
-import sys
+import time
 
 from selenium.common.exceptions import NoSuchElementException
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as ec
 
-sys.path.insert(1, os.path.join(sys.path[0], '..'))
-from Commands.AssertionCommands import *
+EXPLICIT_WAIT_AMT = 2  # Default deadline of find_element for drivers not created by a Portal
 
 by_types = {
     'class': By.CLASS_NAME,
@@ -35,6 +34,55 @@ by_types = {
 }
 
 
+def poll_until(condition, timeout=5, ignored_exceptions=(), initial_interval=0.05, max_interval=0.5, backoff=1.5):
+    """
+    Calls condition until it returns a truthy value or the timeout expires.
+    The condition is always called at least once, so a timeout of 0 checks once.
+    :param condition: function without arguments.
+    :param timeout: number of seconds before giving up, measured with time.monotonic.
+    :param ignored_exceptions: (tuple) exceptions raised by condition which count as a falsy result.
+    :param initial_interval: seconds to sleep after the first failed check.
+    :param max_interval: longest sleep between checks.
+    :param backoff: factor the sleep grows by after each failed check.
+    :return: the first truthy value returned by condition, or its last falsy value (None if it raised).
+    """
+    deadline = time.monotonic() + timeout
+    interval = initial_interval
+    while True:
+        try:
+            result = condition()
+        except ignored_exceptions:
+            result = None
+        if result:
+            return result
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return result
+        time.sleep(min(interval, remaining))
+        interval = min(interval * backoff, max_interval)
+
+
+def find_element(driver, expression, timeout=None):
+    """
+    Finds an element which is expected to exist, waiting for it if necessary.
+    In explicit-wait mode (see Portal) the driver has no implicit wait, so this
+    polls until the deadline; otherwise the driver's implicit wait applies to a
+    single lookup.
+    :param driver: Web driver object.
+    :param expression: XPath expression of the element.
+    :param timeout: seconds to wait in explicit-wait mode; defaults to the Portal's element_wait_amt.
+    :return: WebElement; raises NoSuchElementException if it was not found in time.
+    """
+    if not getattr(driver, 'explicit_waits', False):
+        return driver.find_element_by_xpath(expression)
+    if timeout is None:
+        timeout = getattr(driver, 'element_wait_amt', EXPLICIT_WAIT_AMT)
+    elements = poll_until(lambda: driver.find_elements_by_xpath(expression), timeout)
+    if not elements:
+        raise NoSuchElementException('Unable to locate element: {}'.format(expression))
+    return elements[0]
+
+
 def wait_for_element_to_be_clickable(driver, expression, timeout=5):
     """
     Waits for the specified element to be clickable before proceeding.
@@ -42,19 +90,14 @@ def wait_for_element_to_be_clickable(driver, expression, timeout=5):
     :param expression: XPath expression from PageObject used to detect visibility.
     :param timeout: amount of time (in seconds) to wait for visibility; default is 5 seconds.
     """
-    elem = driver.find_element_by_xpath(expression)
-    for s in range(timeout):
-        try:
-            href_data = elem.get_attribute('href')
-            if href_data is None:
-                time.sleep(1)
-            else:
-                break
-        except Exception:
-            print("Exception raised in wait_for_element_to_be_clickable; page might not be ready.")
-            break
+    elem = find_element(driver, expression)
+    try:
+        clickable = poll_until(lambda: elem.get_attribute('href') is not None, timeout)
+    except Exception:
+        print("Exception raised in wait_for_element_to_be_clickable; page might not be ready.")
     else:
-        print("Expression \"{}\" could not detect a clickable element; page might not be ready.").format(expression if expression else '')
+        if not clickable:
+            print("Expression \"{}\" could not detect a clickable element; page might not be ready.".format(expression if expression else ''))
 
 
 def wait_for_element_to_be_visible(driver, expression, timeout=5):
@@ -65,29 +108,24 @@ def wait_for_element_to_be_visible(driver, expression, timeout=5):
     :param timeout: amount of time (in seconds) to wait for visibility; default is 5 seconds.
     """
     try:
-        elem = driver.find_element_by_xpath(expression)
+        elem = find_element(driver, expression)
     except NoSuchElementException:
         print("Unable to locate element: {}\nPage might not be ready.".format(expression))
     else:
-        for s in range(timeout):
-            try:
-                if elem.is_displayed():
-                    break
-                else:
-                    time.sleep(1)
-            except Exception:
-                print("Exception raised in wait_for_element_to_be_visible; page might not be ready.")
-                break
+        try:
+            visible = poll_until(elem.is_displayed, timeout)
+        except Exception:
+            print("Exception raised in wait_for_element_to_be_visible; page might not be ready.")
         else:
-            print("Expression \"{}\" could not detect a visible element; page might not be ready.").format(expression)
+            if not visible:
+                print("Expression \"{}\" could not detect a visible element; page might not be ready.".format(expression))
 
 
-def wait_until_window_changed(driver, contain_str):
+def wait_until_window_changed(driver, contain_str, timeout=3):
     """
-    Implicit wait time for a window to update the DOM.
+    Waits for a window to update the DOM.
     :param contain_str: String with the window property to be searched.
+    :param timeout: amount of time (in seconds) to wait for the title; default is 3 seconds.
     """
-    try:
-        WebDriverWait(driver, 3).until(ec.title_contains(contain_str))
-    except Exception:
-        print("Window did not change in the allotted time: {0}s. The page might still be loading.\n".format(2))
+    if not poll_until(lambda: contain_str in driver.title, timeout, ignored_exceptions=(Exception,)):
+        print("Window did not change in the allotted time: {0}s. The page might still be loading.\n".format(timeout))
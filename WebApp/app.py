@@ -2,9 +2,14 @@
 Application for Online Analysis UI Testing reporting site
 """
 
+import collections
+import hashlib
+import math
 import sqlite3
+import threading
 
-from flask import Flask, render_template
+from datetime import datetime, timedelta
+from flask import Flask, abort, g, make_response, render_template, request
 
 DATABASE = r'SQLite_database_path_goes_here'
 app = Flask(__name__)
@@ -12,30 +17,308 @@ app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.secret_key = 'many random bytes'
 
+PER_PAGE = 50
+MAX_PER_PAGE = 500
+
+# Columns each table can be sorted by, keyed by the name used in the URL
+SESSION_SORTS = {
+    'endpoint': 'endpoint',
+    'username': 'username',
+    'level': 'assertion_level',
+    'start': 'start_time',
+    'end': 'end_time',
+    'total': 'total_time',
+}
+TEST_SORTS = {
+    'tool': 'tool_name',
+    'file': 'test_name',
+    'details': 'test_details',
+    'status': 'test_passed',
+}
+
+# Pages of completed sessions never change, so browsers and proxies may keep them this long
+CACHE_MAX_AGE = 3600
+RENDER_CACHE_BYTES = 32 * 1024 * 1024
+
+TREND_DAYS = 90
+REGRESSION_DAYS = 7
+MAX_DAYS = 3650
+
+# One row of the trend and regression reports; rates are percentages, or None without tests
+ToolTrend = collections.namedtuple('ToolTrend', ['tool_name', 'sessions', 'tests', 'passed', 'pass_rate', 'average_time'])
+Regression = collections.namedtuple('Regression', ['tool_name', 'tests', 'pass_rate', 'previous_tests', 'previous_pass_rate'])
 
 def connect_db():
-    connection = sqlite3.connect(DATABASE)
-    return connection.cursor()
+    """
+    Returns the request's connection, opening it on first use. It is closed when
+    the request ends, see close_db. The site only reads; the harness creates the
+    tables and the indexes the queries below rely on, see DatabaseManager.
+    """
+    if 'db' not in g:
+        g.db = sqlite3.connect(DATABASE)
+    return g.db.cursor()
+
+
+@app.teardown_appcontext
+def close_db(_):
+    connection = g.pop('db', None)
+    if connection is not None:
+        connection.close()
+
+
+class Paging:
+    """
+    Page and sort order of a table, read from the request's query string.
+    """
+    def __init__(self, sorts, default_sort, default_order):
+        """
+        :param sorts: (dict) column names keyed by the sort names allowed in the URL.
+        :param default_sort: (str) sort name used when the URL has none, or an unknown one.
+        :param default_order: (str) "asc" or "desc".
+        """
+        self.sort = request.args.get('sort', default_sort)
+        if self.sort not in sorts:
+            self.sort = default_sort
+        self.order = request.args.get('order', default_order)
+        if self.order not in ['asc', 'desc']:
+            self.order = default_order
+        self.column = sorts[self.sort]
+        self.per_page = min(max(request.args.get('per_page', PER_PAGE, type=int), 1), MAX_PER_PAGE)
+        self.page = max(request.args.get('page', 1, type=int), 1)
+        self.total = 0
+
+    @property
+    def pages(self):
+        return max(int(math.ceil(self.total / self.per_page)), 1)
+
+    @property
+    def offset(self):
+        return (self.page - 1) * self.per_page
+
+    def order_by(self):
+        """
+        :return: (str) ORDER BY clause. Ties are broken by id so pages never overlap.
+        """
+        return '{0} {1}, id {1}'.format(self.column, self.order.upper())
+
+    def args(self, **changes):
+        """
+        :return: (dict) query string arguments of this page, with changes applied.
+        """
+        args = {'sort': self.sort, 'order': self.order, 'page': self.page, 'per_page': self.per_page}
+        args.update(changes)
+        return args
+
+    def sort_args(self, sort):
+        """
+        :return: (dict) query string arguments which sort by a column, or reverse
+            the order if the table is already sorted by it.
+        """
+        order = 'desc' if sort == self.sort and self.order == 'asc' else 'asc'
+        return self.args(sort=sort, order=order, page=1)
+
+
+class RenderCache:
+    """
+    Rendered pages of completed sessions, keyed by session and query arguments.
+    The least recently used pages are dropped once the pages' total size passes
+    max_bytes. Shared by the threads of the process.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.pages = collections.OrderedDict()  # (body, etag) keyed by get_key; least recently used first
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """
+        :return: (tuple) the page's body and ETag, or None if it is not cached.
+        """
+        with self.lock:
+            page = self.pages.get(key)
+            if page is not None:
+                self.pages.move_to_end(key)
+            return page
+
+    def put(self, key, body, etag):
+        """
+        Caches a page, dropping the least recently used pages to make room. Pages
+        larger than the whole cache are not kept.
+        """
+        if len(body) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.pages.pop(key, None)
+            if old is not None:
+                self.size -= len(old[0])
+            self.pages[key] = (body, etag)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (dropped, _) = self.pages.popitem(last=False)
+                self.size -= len(dropped)
+
+
+render_cache = RenderCache(RENDER_CACHE_BYTES)
+
+
+def cached_response(body, etag):
+    """
+    :return: Response of a completed session's page, or 304 Not Modified if the
+        browser's copy has the same ETag.
+    """
+    response = make_response(body)
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = CACHE_MAX_AGE
+    return response.make_conditional(request)
 
 
 @app.route('/')
 def index():
+    paging = Paging(SESSION_SORTS, 'start', 'desc')
     cur = connect_db()
-    query = 'SELECT * FROM testsession ORDER BY start_time DESC'
-    cur.execute(query)
+    cur.execute('SELECT COUNT(*) FROM testsession')
+    paging.total = cur.fetchone()[0]
+    query = 'SELECT * FROM testsession ORDER BY {0} LIMIT ? OFFSET ?'.format(paging.order_by())
+    cur.execute(query, (paging.per_page, paging.offset))
     results = cur.fetchall()
-    return render_template('index.html', results=results)
+    return render_template('index.html', results=results, paging=paging)
 
 
 @app.route('/tests/<session_id>')
 def tests(session_id):
+    """
+    Results of a session. Sessions with an end time are finished and never change,
+    so their pages are cached, both here and by the browser; a session still
+    running is queried and rendered on every request.
+    """
+    paging = Paging(TEST_SORTS, 'status', 'asc')
+    key = (session_id, paging.sort, paging.order, paging.page, paging.per_page)
+    page = render_cache.get(key)  # Only completed sessions are cached, see below
+    if page is not None:
+        return cached_response(*page)
+
     cur = connect_db()
-    cur.execute('SELECT * FROM tests WHERE tests.session_id = ? ORDER BY tests.test_passed', (session_id,))
+    # Printed at the top of the tests.html page
+    cur.execute('SELECT endpoint, assertion_level, username, end_time FROM testsession WHERE id = ?', (session_id,))
+    session = cur.fetchone()
+    if session is None:
+        abort(404)
+    cur.execute('SELECT COUNT(*) FROM tests WHERE tests.session_id = ?', (session_id,))
+    paging.total = cur.fetchone()[0]
+    query = 'SELECT * FROM tests WHERE tests.session_id = ? ORDER BY {0} LIMIT ? OFFSET ?'.format(paging.order_by())
+    cur.execute(query, (session_id, paging.per_page, paging.offset))
     results = cur.fetchall()
-    # Append the URL to print at the top of the tests.html page
-    cur.execute('SELECT endpoint, assertion_level, username FROM testsession WHERE id = ?', (session_id,))
-    results.append(cur.fetchall())
-    return render_template('tests.html', results=results)
+    body = render_template('tests.html', results=results, session=session, paging=paging)
+    if session[3] is None:
+        response = make_response(body)
+        response.cache_control.no_cache = True
+        return response
+    body = body.encode('utf-8')
+    etag = hashlib.sha1(body).hexdigest()
+    render_cache.put(key, body, etag)
+    return cached_response(body, etag)
+
+
+def get_days(default):
+    """
+    :return: (int) number of days a report covers, from the "days" query argument.
+    """
+    return min(max(request.args.get('days', default, type=int), 1), MAX_DAYS)
+
+
+def get_cutoff(days, now=None):
+    """
+    :return: (str) the time a number of days ago, in the format start times are stored in.
+    """
+    return ((now or datetime.now()) - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def get_rate(passed, tests):
+    return round(100.0 * passed / tests, 1) if tests else None
+
+
+def get_filters():
+    """
+    :return: (tuple) SQL conditions and parameters for the endpoint and level query
+        arguments, which both reports accept.
+    """
+    conditions, params = list(), list()
+    for arg, column in [('endpoint', 'endpoint'), ('level', 'assertion_level')]:
+        if request.args.get(arg):
+            conditions.append('{0} = ?'.format(column))
+            params.append(request.args[arg])
+    return conditions, params
+
+
+def has_summaries(cur):
+    """
+    :return: (bool) False if the harness has not yet written to this database with
+        a version which keeps summary tables, see DatabaseManager.SessionSummary.
+    """
+    cur.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'tool_summary'")
+    return cur.fetchone()[0] > 0
+
+
+@app.route('/trends')
+def trends():
+    """
+    Pass rate and average test time of every tool, and the pass rate per day,
+    over the last "days" days. Only reads the summary tables.
+    """
+    days = get_days(TREND_DAYS)
+    cur = connect_db()
+    if not has_summaries(cur):
+        return render_template('trends.html', days=days, tools=None, daily=None)
+    conditions, params = get_filters()
+    where = ' AND '.join(['start_time >= ?'] + conditions)
+    params = [get_cutoff(days)] + params
+
+    cur.execute(
+        'SELECT tool_name, COUNT(*), SUM(tests), SUM(passed), SUM(duration), SUM(timed) FROM tool_summary '
+        'WHERE {0} GROUP BY tool_name ORDER BY tool_name'.format(where), params
+    )
+    tools = [
+        ToolTrend(name, sessions, tests, passed, get_rate(passed, tests), round(duration / timed, 1) if timed else None)
+        for name, sessions, tests, passed, duration, timed in cur.fetchall()
+    ]
+    cur.execute(
+        'SELECT substr(start_time, 1, 10) AS day, COUNT(*), SUM(tests), SUM(passed) FROM session_summary '
+        'WHERE {0} GROUP BY day ORDER BY day DESC'.format(where), params
+    )
+    daily = [(day, sessions, tests, passed, get_rate(passed, tests)) for day, sessions, tests, passed in cur.fetchall()]
+    return render_template('trends.html', days=days, tools=tools, daily=daily)
+
+
+@app.route('/regressions')
+def regressions():
+    """
+    Tools whose pass rate over the last "days" days is lower than over the days
+    before that, worst drop first. Only reads the summary tables.
+    """
+    days = get_days(REGRESSION_DAYS)
+    cur = connect_db()
+    if not has_summaries(cur):
+        return render_template('regressions.html', days=days, results=None)
+    now = datetime.now()
+    recent, previous = get_cutoff(days, now), get_cutoff(2 * days, now)
+    conditions, params = get_filters()
+    where = ' AND '.join(['start_time >= ?'] + conditions)
+
+    cur.execute(
+        'SELECT tool_name, '
+        'SUM(CASE WHEN start_time >= ? THEN tests ELSE 0 END), SUM(CASE WHEN start_time >= ? THEN passed ELSE 0 END), '
+        'SUM(CASE WHEN start_time < ? THEN tests ELSE 0 END), SUM(CASE WHEN start_time < ? THEN passed ELSE 0 END) '
+        'FROM tool_summary WHERE {0} GROUP BY tool_name'.format(where),
+        [recent, recent, recent, recent, previous] + params
+    )
+    results = list()
+    for name, tests, passed, previous_tests, previous_passed in cur.fetchall():
+        rate, previous_rate = get_rate(passed, tests), get_rate(previous_passed, previous_tests)
+        if rate is not None and previous_rate is not None and rate < previous_rate:
+            results.append(Regression(name, tests, rate, previous_tests, previous_rate))
+    results.sort(key=lambda r: (r.pass_rate - r.previous_pass_rate, r.tool_name))
+    return render_template('regressions.html', days=days, results=results)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,115 @@
+"""
+Benchmark of writing a session's test results to a new SQLite database.
+
+Times the path a run takes: record_result, called once per finished test
+file, which commits each result with its summary updates. For comparison,
+also times the ORM unit of work the Database class used to run once at the
+end of a session (a TestSession and a Tests instance per result, linked
+through rel_session, committed together), and one Core executemany flush of
+every result, which is what Database.flush does with the results a failed
+commit left pending.
+
+    python benchmarks/bench_db_insert.py [directory for the databases]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from SessionClasses.DatabaseManager import Database, TestSession, Tests, db
+
+ROWS = 2000  # Test files in a large session
+
+
+def get_results(count):
+    """
+    :return: (list - tuples) tool category, tool, file name and result, a tenth of them failures.
+    """
+    return [
+        ('Category{0}'.format(i % 5), 'Tool{0}'.format(i % 40), 'test{0}'.format(i), 'failed' if i % 10 == 0 else 'PASS')
+        for i in range(count)
+    ]
+
+
+def new_path(directory, name):
+    path = os.path.join(directory, name)
+    for suffix in ['', '-wal', '-shm']:
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return path
+
+
+def orm_insert(path, results):
+    """
+    The old write path: one ORM instance per row, flushed by the unit of work.
+    """
+    engine = create_engine('sqlite:///' + path)
+    db.Model.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    test_session = TestSession('sanity', None, None, None, 'https://example.com/', None)
+    session.add(test_session)
+    for tool_category, tool, file_name, result in results:
+        row = Tests(' - '.join([tool_category, tool]), file_name, result == 'PASS', result)
+        row.rel_session = test_session
+        session.add(row)
+    session.commit()
+    session.close()
+    engine.dispose()
+
+
+def core_insert(path, results):
+    """
+    Database's Core path, with every result pending before one flush, as after failed commits.
+    """
+    database = Database(path)
+    database.start_session('sanity', time.time(), 'https://example.com/', None)
+    database.pending = [{
+        'session_id': database.session_id,
+        'tool_name': ' - '.join([tool_category, tool]),
+        'test_name': file_name,
+        'test_passed': result == 'PASS',
+        'test_details': result,
+        'duration': 1.0
+    } for tool_category, tool, file_name, result in results]
+    database.flush()
+    database.finish_session(time.time(), time.time())
+    database.close()
+
+
+def committed_insert(path, results):
+    """
+    Database's path during a session: record_result commits each result as its file finishes.
+    """
+    database = Database(path)
+    database.start_session('sanity', time.time(), 'https://example.com/', None)
+    for tool_category, tool, file_name, result in results:
+        database.record_result(tool_category, tool, file_name, result, 1.0)
+    database.finish_session(time.time(), time.time())
+    database.close()
+
+
+def timed(name, func, path, results):
+    start = time.perf_counter()
+    func(path, results)
+    seconds = time.perf_counter() - start
+    print('{0:<40} {1:>6} rows {2:>7.2f}s {3:>8.3f} ms/row'.format(
+        name, len(results), seconds, seconds * 1000 / len(results)
+    ))
+
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else tempfile.mkdtemp()
+    results = get_results(ROWS)
+    timed('record_result, commit per result', committed_insert, new_path(directory, 'committed.db'), results)
+    timed('Old ORM unit of work at session end', orm_insert, new_path(directory, 'orm.db'), results)
+    timed('Core executemany of pending results', core_insert, new_path(directory, 'core.db'), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark of splitting test file lines into typed words.
+
+Compares what execute_command and parse_input used to do (split the line,
+filter out empty words, join quoted strings back together, then try int()
+on every word) with a single pass of Lexer.lex. Lines are the wiki's test
+file lines, see corpus.py.
+
+    python benchmarks/bench_lexer.py
+"""
+
+import time
+
+from corpus import get_corpus
+
+from SessionClasses.Exceptions.CommandExceptions import IllegalCharacterException, InvalidPattern
+from SessionClasses.Lexer import lex
+
+LINES = 100000
+
+
+def old_parse_line(line):
+    """
+    The split of execute_command followed by parse_input, before the lexer.
+    :return: (list) ints, quoted strings with their quotes, and other words.
+    """
+    user_input = [word for word in line.split(" ")]
+    user_input = list(filter(lambda i: i, user_input))
+    parsed_input = list()
+    substring_start = int()
+    parse_substring = False
+
+    for e, c in enumerate(user_input):
+        if not parse_substring and c.startswith("'"):
+            raise IllegalCharacterException("Double quotes only please, no single quotes allowed.")
+        if parse_substring:
+            if '"' in c:
+                substring = ' '.join(user_input[substring_start:e+1])
+                parsed_input.append(substring)
+                parse_substring = False
+        elif '"' in c:
+            if c.count('"') % 2 == 0:
+                parsed_input.append(c)
+            else:
+                parse_substring = True
+                substring_start = e
+        else:
+            parsed_input.append(c)
+
+    for e, token in enumerate(parsed_input):
+        try:
+            int_token = int(token)
+        except ValueError:
+            pass
+        else:
+            parsed_input[e] = int_token
+
+    if parse_substring:
+        raise InvalidPattern("Could not find matching double-quote for arbitrary command.")
+    return parsed_input
+
+
+def timed(name, func, lines):
+    start = time.perf_counter()
+    for line in lines:
+        func(line)
+    seconds = time.perf_counter() - start
+    print('{0:<24} {1:>7.2f} us/line {2:>7.0f} lines/s'.format(name, seconds / len(lines) * 1e6, len(lines) / seconds))
+
+
+def main():
+    lines = get_corpus(LINES)
+    print('{0} lines, {1} characters'.format(len(lines), sum(len(line) for line in lines)))
+    timed('split and parse_input', old_parse_line, lines)
+    timed('lex', lambda line: list(lex(line)), lines)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Microbenchmark of PageHandler's page object lookup, with 1,000 page objects.
+
+Compares the linear scan get_current_page used to do, which read
+driver.current_url several times per page object, with the URL index and its
+LRU memo. No browser is needed: the driver is a stub which counts how often
+current_url is read.
+
+    python benchmarks/bench_page_index.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SessionClasses.PageHandler import PageHandler
+
+PAGE_OBJECTS = 1000
+LOOKUPS = 2000
+DISTINCT_URLS = 200
+
+
+class StubDriver:
+    def __init__(self):
+        self.url = ''
+        self.reads = 0
+
+    @property
+    def current_url(self):
+        self.reads += 1
+        return self.url
+
+
+class StubPortal:
+    def __init__(self):
+        self.driver = StubDriver()
+
+
+class StubPage:
+    def __init__(self, page_id):
+        self.id = page_id
+
+
+def linear_get_current_page(page_objects, portal):
+    """
+    get_current_page before the index, unchanged apart from returning None instead of raising.
+    """
+    for _, page_object in page_objects.items():
+        if portal.driver.current_url == page_object.id:
+            return page_object
+        if '?' in portal.driver.current_url:
+            url_no_params = portal.driver.current_url.split('?')[0]
+            if url_no_params == page_object.id:
+                return page_object
+        if '#' in portal.driver.current_url:
+            url_no_params = portal.driver.current_url.split('#')[0]
+            if url_no_params == page_object.id:
+                return page_object
+        url_no_params = portal.driver.current_url.split('?')[0]
+        url_no_click_through = url_no_params.split('#')[0]
+        path = url_no_click_through.split('/')
+        if page_object.id == path[-1]:
+            return page_object
+        else:
+            partial_path = path[-1]
+            for p in path[-2:0:-1]:
+                if page_object.id == partial_path:
+                    return page_object
+                else:
+                    partial_path = '/'.join([p, partial_path])
+    return None
+
+
+def make_pages():
+    """
+    :return: (dict) page objects whose ids use every form the index matches.
+    """
+    pages = dict()
+    for i in range(PAGE_OBJECTS):
+        form = i % 3
+        if form == 0:
+            page_id = 'https://portal.example.com/app{0}/index.html'.format(i)
+        elif form == 1:
+            page_id = 'page{0}.html'.format(i)
+        else:
+            page_id = 'section{0}/view.html'.format(i)
+        pages['Page{0}'.format(i)] = StubPage(page_id)
+    return pages
+
+
+def make_urls(pages):
+    """
+    :return: (list - str) URLs of random page objects, with queries and fragments added.
+    """
+    random.seed(0)
+    urls = list()
+    for page in random.sample(list(pages.values()), DISTINCT_URLS):
+        url = page.id if page.id.startswith('https') else 'https://portal.example.com/home/' + page.id
+        urls.append(url + random.choice(['', '?id=42', '#details', '?id=42#details']))
+    return [random.choice(urls) for _ in range(LOOKUPS)]
+
+
+def run(name, lookup, portal, urls):
+    portal.driver.reads = 0
+    start = time.perf_counter()
+    found = list()
+    for url in urls:
+        portal.driver.url = url
+        found.append(lookup(portal))
+    seconds = time.perf_counter() - start
+    print('{0:<22} {1:>9.1f} us/lookup {2:>8.1f} current_url reads/lookup'.format(
+        name, seconds / len(urls) * 1e6, portal.driver.reads / len(urls)
+    ))
+    return found
+
+
+def main():
+    pages = make_pages()
+    urls = make_urls(pages)
+    portal = StubPortal()
+    handler = PageHandler()
+    handler.page_objects = pages
+    handler.set_page_index()
+
+    print('{0} page objects, {1} lookups of {2} distinct URLs'.format(PAGE_OBJECTS, LOOKUPS, DISTINCT_URLS))
+    expected = run('linear scan', lambda p: linear_get_current_page(pages, p), portal, urls)
+
+    def cold(p):
+        handler.find_page_object.cache_clear()
+        return handler.get_current_page(p)
+
+    assert run('index, memo cleared', cold, portal, urls) == expected
+    handler.find_page_object.cache_clear()
+    assert run('index with memo', handler.get_current_page, portal, urls) == expected
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+tracemalloc benchmark of the Tokens built while tokenizing.
+
+Builds the Tokens of every line of the wiki corpus (see corpus.py) twice:
+with the Token class as it was, which gave every instance its own args list,
+default_args dict and kwargs list and ran inspect.getfullargspec for every
+command token, and with the slotted Token, which shares its function's
+Signature. Reports the memory the Tokens keep, the peak allocated while
+building them, and the time taken (under tracemalloc, so slower than usual).
+
+    python benchmarks/bench_token_memory.py
+"""
+
+import gc
+import inspect
+import time
+import tracemalloc
+
+from corpus import get_corpus
+
+from SessionClasses.CommandHandler import COMMAND_TOKEN_TYPES, CommandHandler, Token
+from SessionClasses.Lexer import COMMENT, INTEGER, STRING, lex
+
+LINES = 5000
+
+
+class OldToken:
+    """
+    Token before it was slotted, unchanged apart from its name.
+    """
+    def __init__(self, name, token_type, func=None):
+        self.args = list()
+        self.default_args = dict()
+        self.func = func
+        self.kwargs = list()
+        self.name = name
+        self.type = token_type
+        self.unpack_args = None
+        self.unpack_kwargs = None
+
+        if token_type in ['ASSERTION_CMD', 'GENERAL_CMD', 'PORTAL_CMD']:
+            self.set_arg_attributes()
+
+    def set_arg_attributes(self):
+        arg_spec = inspect.getfullargspec(self.func)
+
+        self.args = [a for a in arg_spec.args if not a.startswith('default') and not a.startswith('_')]
+        self.unpack_args = arg_spec.varargs
+        self.unpack_kwargs = arg_spec.varkw
+
+        if arg_spec.defaults:
+            zipped = zip(reversed(arg_spec.args), reversed(arg_spec.defaults))
+            self.default_args = {e[0]: e[1] for e in list(zipped)}
+
+
+def get_token_args(lexemes, index):
+    """
+    :return: (list - tuples) name, type and function of each lexeme's Token, as
+        tokenize_commands finds them; unknown words become page elements.
+    """
+    token_args = list()
+    for lexeme in lexemes:
+        if lexeme.type == COMMENT:
+            break
+        elif lexeme.type == INTEGER:
+            token_args.append((lexeme.value, 'INTEGER', None))
+        elif lexeme.type == STRING:
+            token_args.append((lexeme.value, 'ARBITRARY_CMD', None))
+        else:
+            token_type, func = index.get(lexeme.value.lower(), ('PAGE_ELEMENT', '//div'))
+            token_args.append((lexeme.value.lower(), token_type, func))
+    return token_args
+
+
+def measure(name, token_class, lines):
+    """
+    Builds and keeps every line's Tokens under tracemalloc.
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    start = time.perf_counter()
+    kept = [[token_class(*args) for args in line] for line in lines]
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, 'filename')
+    kept_bytes = sum(s.size_diff for s in stats)
+    blocks = sum(s.count_diff for s in stats)
+    print('{0:<14} {1:>7.0f} bytes/line kept {2:>6.1f} blocks/line {3:>8.0f} bytes/line peak {4:>7.2f} us/line'.format(
+        name, kept_bytes / len(lines), blocks / len(lines), peak / len(lines), seconds / len(lines) * 1e6
+    ))
+    return kept
+
+
+def main():
+    handler = CommandHandler()
+    handler.set_static_commands()
+    lines = [get_token_args(lex(line), handler.static_command_index) for line in get_corpus(LINES)]
+    commands = sum(1 for line in lines for _, token_type, _ in line if token_type in COMMAND_TOKEN_TYPES)
+    print('{0} lines, {1} tokens, {2} command tokens'.format(len(lines), sum(len(line) for line in lines), commands))
+    measure('old Token', OldToken, lines)
+    measure('slotted Token', Token, lines)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark of word lookup in CommandHandler.tokenize_commands.
+
+Compares the lookup tokenize_commands used to do, which rebuilt a dict of
+command dicts (and the ARG_CMD dict) for every line and checked each word
+against them in turn, with the single command index. Also times complete
+tokenize_commands calls. Lines are the wiki's test file lines (see corpus.py);
+words which are not commands are made page elements of a stub page object.
+
+    python benchmarks/bench_tokenize.py
+"""
+
+import time
+
+from corpus import get_corpus
+
+from SessionClasses.CommandHandler import CommandHandler
+from SessionClasses.Lexer import WORD, lex
+
+LINES = 20000
+
+
+class StubPage:
+    def __init__(self, page_elements):
+        self.page_elements = page_elements
+        self.window_elements = dict()
+        self.frame_elements = dict()
+
+
+def old_lookup_words(handler, words):
+    """
+    The lookup of tokenize_commands before the command index, for one line's words.
+    :return: (list - tuples) token type and function of each word.
+    """
+    command_functions = {
+        'ARG_CMD': {v: None for _, values in handler.function_args.items() for v in values},
+        'ASSERTION_CMD': handler.assertion_commands,
+        'GENERAL_CMD': handler.general_commands,
+        'PAGE_ELEMENT': handler.current_page_commands,
+        'PORTAL_CMD': handler.portal_commands,
+        'WINDOWED_ELEMENT': handler.windowed_element_commands,
+    }
+    found = list()
+    for cmd in words:
+        for command_type, commands in command_functions.items():
+            if cmd.lower() in commands.keys():
+                found.append((command_type, commands[cmd.lower()]))
+                break
+    return found
+
+
+def new_lookup_words(handler, words):
+    """
+    The lookup tokenize_word does now, for one line's words.
+    """
+    entries = [handler.lookup_command(cmd.lower()) for cmd in words]
+    return [entry for entry in entries if entry is not None]
+
+
+def timed(name, func, items):
+    start = time.perf_counter()
+    results = [func(item) for item in items]
+    seconds = time.perf_counter() - start
+    print('{0:<28} {1:>7.2f} us/line'.format(name, seconds / len(items) * 1e6))
+    return results
+
+
+def main():
+    lines = get_corpus(LINES)
+    words = [[l.value for l in lex(line) if l.type == WORD] for line in lines]
+
+    handler = CommandHandler()
+    handler.set_static_commands()
+    unknown = set(w for line in words for w in line if handler.lookup_command(w.lower()) is None)
+    handler.set_current_page_commands(StubPage({w.lower(): '//div' for w in unknown}))
+    handler.session_arguments = {'arg_0': 'user', 'arg_1': 'password'}
+
+    print('{0} lines, {1} words'.format(len(lines), sum(len(w) for w in words)))
+    old = timed('lookup, per-line dicts', lambda w: old_lookup_words(handler, w), words)
+    new = timed('lookup, command index', lambda w: new_lookup_words(handler, w), words)
+    assert [[t for t, _ in line] for line in old] == [[t for t, _ in line] for line in new]
+    timed('tokenize_commands', lambda line: handler.tokenize_commands(lex(line), dict()), lines)
+
+
+if __name__ == '__main__':
+    main()
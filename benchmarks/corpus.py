@@ -0,0 +1,58 @@
+"""
+Lines of test files for the parsing benchmarks: the lines of the wiki's code
+blocks (Doc/Wiki) which are test file lines, repeated to a large corpus.
+"""
+
+import glob
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from SessionClasses.Lexer import COMMENT, WORD, lex
+from SessionClasses.Registry import get_registry
+
+FENCE = '`' * 3
+
+
+def get_wiki_lines():
+    """
+    :return: (list - str) the non-blank lines of the wiki's code blocks.
+    """
+    lines = list()
+    for path in sorted(glob.glob(os.path.join(ROOT_DIR, 'Doc', 'Wiki', '*.txt'))):
+        in_block = False
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if len(line) > 2 * len(FENCE) and line.startswith(FENCE) and line.endswith(FENCE):
+                    lines.append(line[len(FENCE):-len(FENCE)])  # A code block on one line
+                elif line.startswith(FENCE):
+                    in_block = not in_block
+                elif in_block and line:
+                    lines.append(line)
+    return lines
+
+
+def is_test_line(line):
+    """
+    :return: (bool) True for comments, and lines which start with a command and lex
+        without errors; the wiki's code blocks also hold Python and shell examples.
+    """
+    try:
+        lexemes = list(lex(line))
+    except Exception:
+        return False
+    if lexemes[0].type == COMMENT:
+        return True
+    return lexemes[0].type == WORD and lexemes[0].value.lower() in get_registry().command_index
+
+
+def get_corpus(size):
+    """
+    :param size: (int) number of lines.
+    :return: (list - str) the wiki's test file lines, repeated until there are size of them.
+    """
+    lines = [line for line in get_wiki_lines() if is_test_line(line)]
+    return (lines * (size // len(lines) + 1))[:size]
@@ -37,37 +37,57 @@ Parameter Details
     * The minimum required options are the tool categories (Standard, Raster, GA).
     ! The list for each category is optional. If blank, all folders in the category will run. Otherwise, only those included will run.
     ! Note that selected_test_files will override these settings.
+10. workers: (int) number of test files to run at the same time.
+    * 1 runs each test file in turn.
+    ! Each worker is a separate process with its own browser, so keep this at or below the number of CPU cores.
+11. portal_reuse_limit: (int) number of test files a browser runs before it is closed and replaced.
+    ! Browsers are reset between test files: extra windows are closed, and cookies and storage are cleared.
+12. explicit_waits: (bool) if True, browsers have no implicit wait.
+    ! Element lookups then wait for their own deadline, or check once when the element may be missing.
+13. settle_timeout: (int) longest time, in seconds, to wait for a page to settle after a click or submit.
+    ! Commands only wait until the page has loaded, has no requests in flight and has stopped changing.
+14. fast_fill: (bool) if True, fill and fill_unique set text box values with a script instead of typing each key.
+    ! Much faster for long text. Text boxes which reject the value are still typed into. See also the fill_fast command.
+15. settle_quiet_ms: (int) number of milliseconds the page must not change for it to count as settled.
+    ! Raise this for pages which keep updating in short bursts after a click.
 """
 
 import os
 import sys
 
-if sys.argv[1].lower() not in ['-a', '-i']:
-    print("ERROR: Missing argument for Automated (-a) or Interactive (-i) Mode.")
+if __name__ == '__main__':  # Required so worker processes can import this module without starting a session
+    if sys.argv[1].lower() not in ['-a', '-i']:
+        print("ERROR: Missing argument for Automated (-a) or Interactive (-i) Mode.")
 
-elif sys.argv[1].lower() == '-i':
-    from SessionClasses.InteractiveManager import InteractiveSession
-    InteractiveSession()
+    elif sys.argv[1].lower() == '-i':
+        from SessionClasses.InteractiveManager import InteractiveSession
+        InteractiveSession()
 
-elif sys.argv[1].lower() == '-a':
-    from SessionClasses.AutomatedManager import AutomatedSession
-    parameters = {
-        'IMDb_Tutorial': {'endpoint': 'https://www.imdb.com/', 'args': []}
-    }
-    AutomatedSession(
-        assertion_levels=['sanity'],
-        verbose=False,
-        log_file_dir=r'C:\UI-log',
-        test_file_dir=os.path.join(os.getcwd(), os.pardir, 'Portal-UI-Test-Files'),
-        parameters=parameters,
-        browsers=['firefox'],
-        selected_test_files=[
-
-        ],
-        database=r'C:\ui-databases\IMDbTest.db',
-        tasks={
-            'Tutorial': [
-                'IMDb'
-            ]
+    elif sys.argv[1].lower() == '-a':
+        from SessionClasses.AutomatedManager import AutomatedSession
+        parameters = {
+            'IMDb_Tutorial': {'endpoint': 'https://www.imdb.com/', 'args': []}
         }
-    )
+        AutomatedSession(
+            assertion_levels=['sanity'],
+            verbose=False,
+            log_file_dir=r'C:\UI-log',
+            test_file_dir=os.path.join(os.getcwd(), os.pardir, 'Portal-UI-Test-Files'),
+            parameters=parameters,
+            browsers=['firefox'],
+            selected_test_files=[
+
+            ],
+            database=r'C:\ui-databases\IMDbTest.db',
+            tasks={
+                'Tutorial': [
+                    'IMDb'
+                ]
+            },
+            workers=1,
+            portal_reuse_limit=25,
+            explicit_waits=False,
+            settle_timeout=5,
+            fast_fill=False,
+            settle_quiet_ms=150
+        )
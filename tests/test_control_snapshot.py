@@ -0,0 +1,77 @@
+"""
+Checks that building a control object and reading its state costs a single
+web driver round trip, see ControlBase.take_snapshot. Runs against a fake
+driver, so no browser is needed:
+
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Commands.AssertionCommands import AssertionCommands
+from ControlObjects.Button import Button
+from ControlObjects.ControlBase import ControlBase, SNAPSHOT_SCRIPT
+from ControlObjects.TimeTextBox import TimeTextBox
+
+
+class FakeDriver:
+    """
+    Counts round trips. Only execute_script answers; any other call fails the test.
+    """
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.calls = 0
+
+    def execute_script(self, script, *args):
+        self.calls += 1
+        assert script == SNAPSHOT_SCRIPT
+        return list(self.snapshot)
+
+
+class FakeElement:
+    """
+    WebElement whose reads would each be a round trip; the snapshot must not need them.
+    """
+    def __init__(self, driver):
+        self.parent = driver
+
+    def __getattr__(self, name):
+        raise AssertionError('WebElement.{0} was called'.format(name))
+
+
+class ControlSnapshotTest(unittest.TestCase):
+    def make_element(self, class_name, parent=True, enabled=True, visible=True, parent_visible=True):
+        driver = FakeDriver(None)
+        element = FakeElement(driver)
+        dijit_parent = FakeElement(driver) if parent else None
+        driver.snapshot = [dijit_parent, class_name, enabled, visible, parent_visible if parent else None]
+        return driver, element, dijit_parent
+
+    def test_base_control_is_one_call(self):
+        driver, element, _ = self.make_element('dijitReset', parent=False, enabled=False)
+        control = ControlBase(element)
+        self.assertEqual((control.enabled, control.visible, control.clickable), (False, True, False))
+        self.assertEqual(driver.calls, 1)
+
+    def test_button_from_dijit_parent_is_one_call(self):
+        driver, element, dijit_parent = self.make_element('dijit dijitButton', visible=False, parent_visible=True)
+        control = AssertionCommands._control_from_web_element(element)
+        self.assertIsInstance(control, Button)
+        self.assertIs(control.element, dijit_parent)
+        self.assertEqual((control.enabled, control.visible, control.clickable), (True, True, True))
+        self.assertEqual(driver.calls, 1)
+
+    def test_time_text_box_is_one_call(self):
+        driver, element, _ = self.make_element('dijit dijitTimeTextBox dijitTextBoxDisabled', enabled=False)
+        control = AssertionCommands._control_from_web_element(element)
+        self.assertIsInstance(control, TimeTextBox)
+        self.assertFalse(control.clickable)
+        self.assertEqual(driver.calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Checks that a failed commit, such as while another connection holds the
+database locked, does not stop the run, and that its results are written by a
+later commit. Runs against a temporary SQLite database:
+
+    python -m unittest discover tests
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SessionClasses.DatabaseManager import Database
+
+
+class QuickDatabase(Database):
+    """
+    Database which gives up on a lock quickly, so the tests do not wait for it.
+    """
+    BUSY_TIMEOUT = 0.1
+
+
+class TestLockedDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.database_path = os.path.join(self.directory, 'results.sqlite')
+        self.database = QuickDatabase(self.database_path)
+        self.database.start_session('high', time.time(), 'https://example.com/', None)
+        self.lock = sqlite3.connect(self.database_path, isolation_level=None)
+
+    def tearDown(self):
+        self.lock.close()
+        self.database.close()
+        shutil.rmtree(self.directory)
+
+    def count(self, query):
+        connection = sqlite3.connect(self.database_path)
+        try:
+            return connection.execute(query).fetchone()[0]
+        finally:
+            connection.close()
+
+    def test_result_is_written_after_lock_is_released(self):
+        self.lock.execute('BEGIN EXCLUSIVE')
+        self.database.record_result('Analysis', 'Buffer', 'buffer_1.txt', 'PASS', 1.0)
+        self.assertEqual(len(self.database.pending), 1)
+        self.lock.execute('ROLLBACK')
+
+        self.database.record_result('Analysis', 'Buffer', 'buffer_2.txt', 'FAIL: NoSuchElementException', 2.0)
+        self.assertEqual(self.database.pending, [])
+        self.assertEqual(self.count('SELECT COUNT(*) FROM tests'), 2)
+        self.assertEqual(self.count('SELECT tests FROM session_summary'), 2)
+        self.assertEqual(self.count('SELECT passed FROM tool_summary'), 1)
+
+    def test_session_end_is_written_by_close(self):
+        self.database.record_result('Analysis', 'Buffer', 'buffer_1.txt', 'PASS', 1.0)
+        self.lock.execute('BEGIN EXCLUSIVE')
+        self.database.record_result('Analysis', 'Buffer', 'buffer_2.txt', 'PASS', 1.0)
+        start_time = time.time()
+        self.database.finish_session(start_time, start_time + 60)
+        self.assertIsNotNone(self.database.session_id)
+        self.lock.execute('ROLLBACK')
+
+        self.database.close()
+        self.assertIsNone(self.database.session_id)
+        self.assertEqual(self.count('SELECT COUNT(*) FROM tests'), 2)
+        self.assertEqual(self.count('SELECT COUNT(*) FROM testsession WHERE end_time IS NOT NULL'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()